@@ -0,0 +1,160 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from crossword import Crossword, WordStore
+from generate import CrosswordCreator, SearchTimeout
+
+# Vocabulary of this process, loaded once and shared by its puzzles
+store = None
+
+
+def load(words_file):
+    """
+    Loads the vocabulary, unless this process already has it (workers
+    forked from a process that loaded it inherit it).
+    """
+    global store
+    if store is None or store.words_file != words_file:
+        store = WordStore(words_file)
+
+
+def read_manifest(manifest):
+    """
+    Returns the structure files listed in a manifest, one per line.
+    Relative paths are relative to the manifest; blank lines and lines
+    starting with # are skipped.
+    """
+    base = os.path.dirname(manifest)
+    structures = []
+    with open(manifest) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                structures.append(os.path.join(base, line))
+    return structures
+
+
+def solve(task):
+    """
+    Solves one structure with the process's vocabulary and returns its
+    result record. The solution is given as rows of letters, with # for
+    blocked cells and a space for open cells outside every word.
+    """
+    structure, timeout, images, search = task
+    result = {
+        "structure": structure,
+        "solved": False,
+        "solution": None,
+        "reason": None,
+        "seconds": None,
+        "nodes": None,
+    }
+    start = time.perf_counter()
+    try:
+        crossword = Crossword(structure, store)
+        creator = CrosswordCreator(crossword)
+        try:
+            assignment = creator.solve(timeout=timeout, search=search)
+        except SearchTimeout:
+            assignment = None
+            result["reason"] = "timeout"
+        result["nodes"] = creator.nodes
+    except Exception as e:
+        result["reason"] = f"error: {e}"
+        result["seconds"] = time.perf_counter() - start
+        return result
+    result["seconds"] = time.perf_counter() - start
+
+    if assignment is None:
+        result["reason"] = result["reason"] or "no solution"
+        return result
+
+    letters = creator.letter_grid(assignment)
+    result["solved"] = True
+    result["solution"] = [
+        "".join(
+            (letters[i][j] or " ") if crossword.structure[i][j] else "#"
+            for j in range(crossword.width)
+        )
+        for i in range(crossword.height)
+    ]
+    if images:
+        name = os.path.splitext(os.path.basename(structure))[0]
+        filename = os.path.join(images, f"{name}.png")
+        try:
+            creator.save(assignment, filename)
+            result["image"] = filename
+        except Exception as e:
+            result["image_error"] = str(e)
+    return result
+
+
+def batch(structures, words_file, processes=None, timeout=None, images=None,
+          search="backtrack"):
+    """
+    Solves every structure with one vocabulary across a pool of worker
+    processes, yielding result records as puzzles finish.
+    """
+    # Load and index the lengths the puzzles use before the workers
+    # start, so that forked workers share them
+    load(words_file)
+    index = store.index()
+    for structure in structures:
+        try:
+            crossword = Crossword(structure, store)
+        except OSError:
+            continue
+        for variable in crossword.variables:
+            index.letters_at(variable.length, 0)
+
+    if images:
+        os.makedirs(images, exist_ok=True)
+    tasks = [
+        (structure, timeout, images, search) for structure in structures
+    ]
+    with multiprocessing.Pool(
+        processes, initializer=load, initargs=(words_file,)
+    ) as pool:
+        yield from pool.imap_unordered(solve, tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate many crosswords from one word list."
+    )
+    parser.add_argument("manifest", help="file listing structure files")
+    parser.add_argument("words", help="word list")
+    parser.add_argument("--output", help="JSONL file (default: stdout)")
+    parser.add_argument("--images", help="directory to save solved grids to")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="seconds allowed per puzzle")
+    parser.add_argument("--search", choices=["backtrack", "cbj"],
+                        default="backtrack")
+    args = parser.parse_args()
+
+    structures = read_manifest(args.manifest)
+    output = open(args.output, "w") if args.output else sys.stdout
+    solved = 0
+    start = time.perf_counter()
+    try:
+        for result in batch(structures, args.words,
+                            processes=args.processes, timeout=args.timeout,
+                            images=args.images, search=args.search):
+            solved += result["solved"]
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"Solved {solved} of {len(structures)} puzzles in "
+          f"{time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
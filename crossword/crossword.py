@@ -1,8 +1,41 @@
+import mmap
+import os
+import struct
+import sys
+
+
+def popcount(bits):
+    """Returns the number of bits set in a non-negative integer."""
+    return bin(bits).count("1")
+
+
+def to_bits(ids):
+    """Returns the bitset (an integer) with the given bit positions set."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    mask = bytearray(max(ids) // 8 + 1)
+    for k in ids:
+        mask[k >> 3] |= 1 << (k & 7)
+    return int.from_bytes(mask, "little")
+
+
+def from_bits(bits):
+    """Yields the positions of the bits set in a bitset, in order."""
+    digits = bin(bits)[:1:-1]
+    k = digits.find("1")
+    while k != -1:
+        yield k
+        k = digits.find("1", k + 1)
+
+
 class Variable():
 
     ACROSS = "across"
     DOWN = "down"
 
+    __slots__ = ("i", "j", "direction", "length", "cells", "_hash")
+
     def __init__(self, i, j, direction, length):
         """Create a new variable with starting point, direction, and length."""
         self.i = i
@@ -15,9 +48,10 @@ class Variable():
                 (self.i + (k if self.direction == Variable.DOWN else 0),
                  self.j + (k if self.direction == Variable.ACROSS else 0))
             )
+        self._hash = hash((self.i, self.j, self.direction, self.length))
 
     def __hash__(self):
-        return hash((self.i, self.j, self.direction, self.length))
+        return self._hash
 
     def __eq__(self, other):
         return (
@@ -35,9 +69,23 @@ class Variable():
         return f"Variable({self.i}, {self.j}, {direction}, {self.length})"
 
 
+class Overlaps(dict):
+    """
+    Overlaps keyed by pairs of variables. Pairs that do not overlap are
+    not stored, and look up as None.
+    """
+
+    def __missing__(self, key):
+        return None
+
+
 class Crossword():
 
     def __init__(self, structure_file, words_file):
+        """
+        Load a structure and a vocabulary. `words_file` is a path to a
+        word list, or a WordStore already loaded from one.
+        """
 
         # Determine structure of crossword
         with open(structure_file) as f:
@@ -58,8 +106,11 @@ class Crossword():
                 self.structure.append(row)
 
         # Save vocabulary list
-        with open(words_file) as f:
-            self.words = set(f.read().upper().splitlines())
+        if isinstance(words_file, WordStore):
+            self.words = words_file
+        else:
+            self.words = WordStore(words_file)
+        self.index = self.words.index()
 
         # Determine variable set
         self.variables = set()
@@ -108,26 +159,341 @@ class Crossword():
         # For any pair of variables v1, v2, their overlap is either:
         #    None, if the two variables do not overlap; or
         #    (i, j), where v1's ith character overlaps v2's jth character
-        self.overlaps = dict()
-        for v1 in self.variables:
-            for v2 in self.variables:
-                if v1 == v2:
-                    continue
-                cells1 = v1.cells
-                cells2 = v2.cells
-                intersection = set(cells1).intersection(cells2)
-                if not intersection:
-                    self.overlaps[v1, v2] = None
-                else:
-                    intersection = intersection.pop()
-                    self.overlaps[v1, v2] = (
-                        cells1.index(intersection),
-                        cells2.index(intersection)
-                    )
+        # Only variables sharing a cell overlap, so pairs are found through
+        # the variables covering each cell
+        covering = dict()
+        for var in self.variables:
+            for k, cell in enumerate(var.cells):
+                covering.setdefault(cell, []).append((var, k))
+        self.overlaps = Overlaps()
+        adjacent = {var: set() for var in self.variables}
+        for members in covering.values():
+            for v1, k1 in members:
+                for v2, k2 in members:
+                    if v1 != v2:
+                        self.overlaps[v1, v2] = (k1, k2)
+                        adjacent[v1].add(v2)
+        self.adjacency = {
+            var: frozenset(neighbors)
+            for var, neighbors in adjacent.items()
+        }
 
     def neighbors(self, var):
         """Given a variable, return set of overlapping variables."""
-        return set(
-            v for v in self.variables
-            if v != var and self.overlaps[v, var]
+        return self.adjacency[var]
+
+
+class WordStore():
+    """
+    Vocabulary read once and shared: every word is interned and the words
+    are kept in sorted buckets by length, where a word's position in its
+    bucket is its id.
+
+    The buckets are cached next to the word list in a binary file of
+    fixed-width records per length, which later loads map into memory
+    with mmap; a bucket is decoded only when a variable of its length
+    asks for it. The cache is used only if the word list's size and
+    modification time match those it was built from.
+    """
+
+    MAGIC = b"CROSSWORD-WORDS-1"
+
+    # Source mtime (ns), source size, number of buckets
+    HEADER = struct.Struct("<qqI")
+
+    # Word length, number of words, bytes per record, data offset
+    ENTRY = struct.Struct("<IIIQ")
+
+    def __init__(self, words_file, cache=True):
+        """
+        Load the words of `words_file`, through its cache file if `cache`
+        is true and the cache is current; otherwise the word list is read
+        and, if `cache` is true, a new cache is written.
+        """
+        self.words_file = words_file
+        self.cache_file = words_file + ".cache"
+
+        # Length -> (count, width, offset) of the bucket in the cache
+        self.entries = dict()
+        self.mapped = None
+
+        # Length -> list of words, by id; and length -> {word: id}
+        self.buckets = dict()
+        self._ids = dict()
+        self._index = None
+
+        if not (cache and self.load_cache()):
+            self.read_words()
+            if cache:
+                self.write_cache()
+
+    def read_words(self):
+        """Reads, interns and buckets the words of the word list."""
+        with open(self.words_file) as f:
+            words = set(f.read().upper().splitlines())
+        words.discard("")
+        for word in sorted(words):
+            self.buckets.setdefault(len(word), []).append(sys.intern(word))
+
+    def source_signature(self):
+        stat = os.stat(self.words_file)
+        return stat.st_mtime_ns, stat.st_size
+
+    def load_cache(self):
+        """
+        Maps the cache file if it is current for the word list. Returns
+        whether it was loaded.
+        """
+        try:
+            with open(self.cache_file, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+
+        try:
+            start = len(WordStore.MAGIC)
+            if mapped[:start] != WordStore.MAGIC:
+                return False
+            mtime, size, n = WordStore.HEADER.unpack_from(mapped, start)
+            if (mtime, size) != self.source_signature():
+                return False
+            position = start + WordStore.HEADER.size
+            for _ in range(n):
+                length, count, width, offset = WordStore.ENTRY.unpack_from(
+                    mapped, position
+                )
+                position += WordStore.ENTRY.size
+                if offset + count * width > len(mapped):
+                    raise struct.error("truncated cache")
+                self.entries[length] = (count, width, offset)
+        except (OSError, struct.error):
+            self.entries = dict()
+            return False
+        self.mapped = mapped
+        return True
+
+    def write_cache(self):
+        """Writes the buckets to the cache file, if it can be written."""
+        mtime, size = self.source_signature()
+        encoded = {
+            length: [word.encode() for word in bucket]
+            for length, bucket in sorted(self.buckets.items())
+        }
+        offset = (
+            len(WordStore.MAGIC) + WordStore.HEADER.size
+            + WordStore.ENTRY.size * len(encoded)
         )
+        entries = []
+        chunks = []
+        for length, records in encoded.items():
+            width = max(len(record) for record in records)
+            entries.append(WordStore.ENTRY.pack(
+                length, len(records), width, offset
+            ))
+            chunks.append(b"".join(record.ljust(width, b"\0")
+                                   for record in records))
+            offset += width * len(records)
+
+        temporary = f"{self.cache_file}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "wb") as f:
+                f.write(WordStore.MAGIC)
+                f.write(WordStore.HEADER.pack(mtime, size, len(entries)))
+                f.writelines(entries)
+                f.writelines(chunks)
+            os.replace(temporary, self.cache_file)
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def lengths(self):
+        """Returns the word lengths in the store, in increasing order."""
+        return sorted(set(self.entries) | set(self.buckets))
+
+    def bucket(self, length):
+        """Returns the words of a length, in id order."""
+        bucket = self.buckets.get(length)
+        if bucket is None:
+            bucket = []
+            if length in self.entries:
+                count, width, offset = self.entries[length]
+                for k in range(offset, offset + count * width, width):
+                    bucket.append(sys.intern(
+                        self.mapped[k:k + width].rstrip(b"\0").decode()
+                    ))
+            self.buckets[length] = bucket
+        return bucket
+
+    def ids(self, length):
+        """Returns {word: id} for the words of a length."""
+        ids = self._ids.get(length)
+        if ids is None:
+            ids = {word: k for k, word in enumerate(self.bucket(length))}
+            self._ids[length] = ids
+        return ids
+
+    def index(self):
+        """Returns the letter index over the store, built once."""
+        if self._index is None:
+            self._index = WordIndex(self)
+        return self._index
+
+    def __contains__(self, word):
+        return word in self.ids(len(word))
+
+    def __iter__(self):
+        for length in self.lengths():
+            yield from self.bucket(length)
+
+    def __len__(self):
+        return sum(len(self.bucket(length)) for length in self.lengths())
+
+
+class WordIndex():
+    """
+    Vocabulary indexed for bitset domains.
+
+    Words are numbered within their length by a WordStore. For every
+    length, position and letter there is a bitset of the ids of the words
+    of that length with that letter at that position, so the words of a
+    domain that agree with a letter are one AND away. A length is indexed
+    the first time it is needed.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+        # Length -> position -> {letter: bitset of word ids}
+        self.letters = dict()
+
+    def full(self, length):
+        """Returns the bitset of every word of a length."""
+        return (1 << len(self.store.bucket(length))) - 1
+
+    def letters_at(self, length, position):
+        """
+        Returns {letter: bitset} of the words of a length by their letter
+        at a position; empty if there are no words of that length.
+        """
+        positions = self.letters.get(length)
+        if positions is None:
+            positions = []
+            bucket = self.store.bucket(length)
+            for p in range(length if bucket else 0):
+                ids = dict()
+                for k, word in enumerate(bucket):
+                    ids.setdefault(word[p], []).append(k)
+                positions.append({
+                    letter: to_bits(members)
+                    for letter, members in ids.items()
+                })
+            self.letters[length] = positions
+        return positions[position] if positions else dict()
+
+    def bit(self, word):
+        """Returns the bitset holding just `word`."""
+        return 1 << self.store.ids(len(word))[word]
+
+    def domain(self, length):
+        """Returns a domain holding every word of a length."""
+        return Domain(self, length, self.full(length))
+
+
+class Domain():
+    """
+    Set of words of one length, stored as a bitset of word ids in a
+    WordIndex. Supports the set operations the solver uses.
+
+    A domain can also count its words by letter at a position. Those
+    tables are kept up to date by adjusting them for each word added or
+    removed when only a few change, and rebuilt on demand otherwise.
+    """
+
+    # Most words changed at once for which letter counts are adjusted
+    # rather than rebuilt
+    INCREMENTAL_LIMIT = 32
+
+    def __init__(self, index, length, bits=0):
+        self.index = index
+        self.length = length
+        self._bits = bits
+        self._size = None
+
+        # Position -> {letter: number of words with it there}
+        self._counts = dict()
+
+    @property
+    def bits(self):
+        return self._bits
+
+    @bits.setter
+    def bits(self, bits):
+        if bits == self._bits:
+            return
+        if self._counts:
+            changed = self._bits ^ bits
+            if popcount(changed) <= Domain.INCREMENTAL_LIMIT:
+                words = self.index.store.bucket(self.length)
+                for k in from_bits(changed):
+                    step = 1 if bits >> k & 1 else -1
+                    for position, counts in self._counts.items():
+                        letter = words[k][position]
+                        counts[letter] = counts.get(letter, 0) + step
+            else:
+                self._counts = dict()
+        self._bits = bits
+        self._size = None
+
+    def letter_counts(self, position):
+        """Returns {letter: number of words with that letter at position}."""
+        counts = self._counts.get(position)
+        if counts is None:
+            counts = {
+                letter: popcount(self._bits & bits)
+                for letter, bits in self.index.letters_at(
+                    self.length, position
+                ).items()
+            }
+            self._counts[position] = counts
+        return counts
+
+    def __len__(self):
+        if self._size is None:
+            self._size = popcount(self._bits)
+        return self._size
+
+    def __iter__(self):
+        words = self.index.store.bucket(self.length)
+        for k in from_bits(self._bits):
+            yield words[k]
+
+    def __contains__(self, word):
+        k = self.index.store.ids(self.length).get(word)
+        return k is not None and bool(self._bits >> k & 1)
+
+    def __eq__(self, other):
+        if isinstance(other, Domain):
+            return self.length == other.length and self._bits == other._bits
+        return set(self) == other
+
+    def __repr__(self):
+        return f"Domain({set(self)})"
+
+    def remove(self, word):
+        if word not in self:
+            raise KeyError(word)
+        self.discard(word)
+
+    def discard(self, word):
+        k = self.index.store.ids(self.length).get(word)
+        if k is not None:
+            self.bits = self._bits & ~(1 << k)
+
+    def copy(self):
+        return Domain(self.index, self.length, self._bits)
+
+    def matching(self, position, letter):
+        """Returns the bits of the words with `letter` at `position`."""
+        return self._bits & self.index.letters_at(
+            self.length, position
+        ).get(letter, 0)
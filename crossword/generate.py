@@ -1,8 +1,67 @@
-import sys
+import argparse
+import os
+import time
+from collections import OrderedDict, deque
 
 from crossword import *
 
 
+class SearchTimeout(Exception):
+    """Raised when solving runs past its deadline."""
+
+
+class NogoodStore():
+    """
+    Bounded store of learned nogoods: sets of (variable, word) pairs that
+    cannot all be part of a solution. Only nogoods of at most `max_size`
+    pairs are kept, and at most `capacity` of them; the least recently
+    used is evicted first. Nogoods are indexed by each of their pairs.
+    """
+
+    def __init__(self, capacity=10000, max_size=4):
+        self.capacity = capacity
+        self.max_size = max_size
+        self.nogoods = OrderedDict()
+        self.index = dict()
+        self.hits = 0
+
+    def __len__(self):
+        return len(self.nogoods)
+
+    def add(self, nogood):
+        """Learns a nogood, a frozenset of (variable, word) pairs."""
+        if len(nogood) > self.max_size:
+            return
+        if nogood in self.nogoods:
+            self.nogoods.move_to_end(nogood)
+            return
+        self.nogoods[nogood] = None
+        for pair in nogood:
+            self.index.setdefault(pair, set()).add(nogood)
+        if len(self.nogoods) > self.capacity:
+            old, _ = self.nogoods.popitem(last=False)
+            for pair in old:
+                self.index[pair].discard(old)
+                if not self.index[pair]:
+                    del self.index[pair]
+
+    def conflict(self, var, value, assignment):
+        """
+        If assigning `value` to `var` would complete a nogood given
+        `assignment`, return the other variables of that nogood, an empty
+        set for a nogood of `var` alone; otherwise return None.
+        """
+        for nogood in self.index.get((var, value), ()):
+            if all(
+                other == var or assignment.get(other) == word
+                for other, word in nogood
+            ):
+                self.hits += 1
+                self.nogoods.move_to_end(nogood)
+                return set(other for other, _ in nogood if other != var)
+        return None
+
+
 class CrosswordCreator():
 
     def __init__(self, crossword):
@@ -11,10 +70,33 @@ class CrosswordCreator():
         """
         self.crossword = crossword
         self.domains = {
-            var: self.crossword.words.copy()
+            var: self.crossword.index.domain(var.length)
             for var in self.crossword.variables
         }
 
+        # Undo trail of (variable, previous domain bits, previous causes),
+        # and search stats
+        self.trail = []
+
+        # Words used by the current partial assignment, and by which variable
+        self.used = dict()
+
+        # Conflict-directed backjumping: for each variable, the assigned
+        # variables whose words its domain was narrowed by, directly or
+        # through propagation; the variable whose domain propagation last
+        # emptied; and the learned nogoods
+        self.causes = {
+            var: frozenset() for var in self.crossword.variables
+        }
+        self.wiped = None
+        self.nogoods = NogoodStore()
+        self.backjumps = 0
+
+        # time.monotonic() after which solving gives up, if any
+        self.deadline = None
+        self.nodes = 0
+        self.propagation_seconds = 0.0
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -61,7 +143,10 @@ class CrosswordCreator():
              self.crossword.height * cell_size),
             "black"
         )
-        font = ImageFont.truetype("assets/fonts/OpenSans-Regular.ttf", 80)
+        font = ImageFont.truetype(os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            "assets", "fonts", "OpenSans-Regular.ttf"
+        ), 80)
         draw = ImageDraw.Draw(img)
 
         for i in range(self.crossword.height):
@@ -76,7 +161,13 @@ class CrosswordCreator():
                 if self.crossword.structure[i][j]:
                     draw.rectangle(rect, fill="white")
                     if letters[i][j]:
-                        w, h = draw.textsize(letters[i][j], font=font)
+                        # Pillow 10 replaced textsize with textbbox
+                        if hasattr(draw, "textbbox"):
+                            _, _, w, h = draw.textbbox(
+                                (0, 0), letters[i][j], font=font
+                            )
+                        else:
+                            w, h = draw.textsize(letters[i][j], font=font)
                         draw.text(
                             (rect[0][0] + ((interior_size - w) / 2),
                              rect[0][1] + ((interior_size - h) / 2) - 10),
@@ -85,13 +176,44 @@ class CrosswordCreator():
 
         img.save(filename)
 
-    def solve(self):
+    def solve(self, timeout=None, search="backtrack"):
         """
         Enforce node and arc consistency, and then solve the CSP.
+        If `timeout` is given, raise SearchTimeout once solving has taken
+        more than `timeout` seconds.
+
+        `search` is "backtrack", for chronological backtracking, or "cbj",
+        for conflict-directed backjumping with nogood learning. Both
+        maintain arc consistency after each assignment.
         """
+        if search not in ("backtrack", "cbj"):
+            raise ValueError(f"unknown search {search!r}")
+        self.deadline = None
+        if timeout is not None:
+            self.deadline = time.monotonic() + timeout
+        self.nodes = 0
+        self.propagation_seconds = 0.0
         self.enforce_node_consistency()
-        self.ac3()
-        return self.backtrack(dict())
+        if not self.ac3():
+            return None
+
+        # Removals made before search are never undone
+        self.trail.clear()
+        self.used.clear()
+        if search == "cbj":
+            assignment, _ = self.backjump(dict())
+        else:
+            assignment = self.backtrack(dict())
+
+        # Search checks each assignment incrementally; verify the result
+        if assignment is not None and not self.consistent(assignment):
+            raise RuntimeError("search produced an inconsistent assignment")
+        return assignment
+
+    def check_deadline(self):
+        """Raise SearchTimeout if the deadline has passed."""
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise SearchTimeout
 
     def enforce_node_consistency(self):
         """
@@ -99,10 +221,13 @@ class CrosswordCreator():
         (Remove any values that are inconsistent with a variable's unary
         constraints; in this case, the length of the word.)
         """
-        for variable in self.domains:
-            for value in self.domains[variable].copy():
-                if len(value) != variable.length:
-                    self.domains[variable].remove(value)
+        # Domains are built from the words of their variable's length, so
+        # this only drops words of any other length they were given
+        for variable, domain in self.domains.items():
+            if domain.length != variable.length:
+                self.domains[variable] = Domain(
+                    domain.index, variable.length
+                )
 
     def revise(self, x, y):
         """
@@ -113,18 +238,46 @@ class CrosswordCreator():
         Return True if a revision was made to the domain of `x`; return
         False if no revision was made.
         """
-        revised = False
         x_i, y_j = self.crossword.overlaps[x, y]
-        for x_value in self.domains[x].copy():
-            remove = True
-            for y_value in self.domains[y]:
-                #if len(x_value)==len(y_value) and x_value[x_i]!=y_value[y_j]:
-                if x_value[x_i]==y_value[y_j]:
-                    remove = False
-            if remove:
-                self.domains[x].remove(x_value)
-                revised = True
-        return revised
+        x_letters = self.crossword.index.letters_at(x.length, x_i)
+        y_letters = self.crossword.index.letters_at(y.length, y_j)
+        y_bits = self.domains[y].bits
+
+        # Keep the words of x whose letter some word of y still has
+        supported = 0
+        for letter, bits in y_letters.items():
+            if y_bits & bits:
+                supported |= x_letters.get(letter, 0)
+        bits = self.domains[x].bits & supported
+        if bits == self.domains[x].bits:
+            return False
+
+        # What narrowed y's domain now also explains x's
+        self.restrict(x, bits, self.causes[x] | self.causes[y])
+        return True
+
+    def restrict(self, var, bits, causes=None):
+        """
+        Narrow the domain of `var` to the words in `bits`, recording its
+        previous words on the trail so that `undo` can restore them.
+        `causes`, if given, replaces the set of assigned variables that
+        explain the domain.
+        """
+        domain = self.domains[var]
+        if bits != domain.bits:
+            self.trail.append((var, domain.bits, self.causes[var]))
+            domain.bits = bits
+            if causes is not None:
+                self.causes[var] = causes
+
+    def undo(self, mark):
+        """
+        Restore every domain narrowed since the trail had length `mark`.
+        """
+        while len(self.trail) > mark:
+            var, bits, causes = self.trail.pop()
+            self.domains[var].bits = bits
+            self.causes[var] = causes
 
     def ac3(self, arcs=None):
         """
@@ -135,18 +288,27 @@ class CrosswordCreator():
         Return True if arc consistency is enforced and no domains are empty;
         return False if one or more domains end up empty.
         """
-        if not arcs:
+        if arcs is None:
             #vars = list(self.domains.keys())
             arcs = [
                 (v1,v2) for v1 in self.domains for v2 in self.crossword.neighbors(v1)
             ]
+
+        # Queue of arcs, each queued at most once at a time
+        arcs = deque(arcs)
+        queued = set(arcs)
         while arcs:
-            x, y = arcs.pop(0)
+            self.check_deadline()
+            x, y = arcs.popleft()
+            queued.discard((x, y))
             if self.revise(x, y):
                 if not self.domains[x]:
+                    self.wiped = x
                     return False
-                for z in self.crossword.neighbors(x)-self.domains[y]:
-                    arcs.append((z,x))
+                for z in self.crossword.neighbors(x) - {y}:
+                    if (z, x) not in queued:
+                        queued.add((z, x))
+                        arcs.append((z, x))
         return True
 
     def assignment_complete(self, assignment):
@@ -196,6 +358,22 @@ class CrosswordCreator():
                 
         return True
 
+    def consistent_with(self, var, value, assignment):
+        """
+        Return True if assigning `value` to `var` keeps a consistent
+        `assignment` consistent: the word must have the right length, not
+        be used already, and agree with every assigned neighbor. Only
+        `var`'s own constraints are checked.
+        """
+        if var.length != len(value) or value in self.used:
+            return False
+        for neighbor in self.crossword.neighbors(var):
+            if neighbor in assignment:
+                i, j = self.crossword.overlaps[var, neighbor]
+                if value[i] != assignment[neighbor][j]:
+                    return False
+        return True
+
     def order_domain_values(self, var, assignment):
         """
         Return a list of values in the domain of `var`, in order by
@@ -203,17 +381,24 @@ class CrosswordCreator():
         The first value in the list, for example, should be the one
         that rules out the fewest values among the neighbors of `var`.
         """
-        neighbors = self.crossword.neighbors(var)
-        neighbors -= set(assignment)
-        vals = dict()
-        for value in self.domains[var]:
-            vals[value] = 0
-            for neighbor in neighbors:
-                if value in self.domains[neighbor]:
-                    vals[value] += 1
-        
-        return sorted(vals, key=vals.get) # sort by values of each key
-        
+        # A value rules out the words of each unassigned neighbor that
+        # have another letter where they overlap: the neighbor's domain
+        # size less the words with the value's letter there
+        tables = []
+        for neighbor in self.crossword.neighbors(var):
+            if neighbor not in assignment:
+                i, j = self.crossword.overlaps[var, neighbor]
+                domain = self.domains[neighbor]
+                tables.append((i, len(domain), domain.letter_counts(j)))
+
+        def ruled_out(value):
+            return sum(
+                size - counts.get(value[i], 0)
+                for i, size, counts in tables
+            )
+
+        return sorted(self.domains[var], key=ruled_out)
+
 
     def select_unassigned_variable(self, assignment):
         """
@@ -233,20 +418,26 @@ class CrosswordCreator():
                 best_var = var
         return best_var
 
-    #def inference(self, var, assignment):
-    #    """
-    ###   Algorithm for enforcing arc-consistency everytime
-    ##    a new assignment is made.
-    ##    """
-    #    inferences = dict()
-    #    arcs = [(v1,var) for v1 in self.crossword.neighbors(var)]
-    #    if self.ac3(arcs):
-    #        for variable in self.domains:
-    #           if variable not in assignment and variable!=var:
-    #               if len(self.domains[var])==1:
-    #                   inferences[var]=self.domains[var]
-    #        return inferences
+    def inference(self, var, assignment):
+        """
+        Maintain arc consistency after `var` is assigned: narrow its domain
+        to its word and run AC-3 on the arcs from its unassigned neighbors,
+        which carries on to their neighbors as domains shrink. Removals go
+        on the trail.
 
+        Return False if some domain ends up empty; return True otherwise.
+        """
+        start = time.perf_counter()
+        self.restrict(
+            var, self.crossword.index.bit(assignment[var]), frozenset([var])
+        )
+        arcs = [
+            (neighbor, var) for neighbor in self.crossword.neighbors(var)
+            if neighbor not in assignment
+        ]
+        consistent = self.ac3(arcs)
+        self.propagation_seconds += time.perf_counter() - start
+        return consistent
 
     def backtrack(self, assignment):
         """
@@ -257,52 +448,144 @@ class CrosswordCreator():
 
         If no assignment is possible, return None.
         """
+        self.nodes += 1
+        self.check_deadline()
         if self.assignment_complete(assignment):
             return assignment
         var = self.select_unassigned_variable(assignment)
-        for value in self.domains[var]:
-            new_assignment = assignment.copy()
-            new_assignment[var]=value
-            #assignment[var]=value
-            if self.consistent(new_assignment):
-                assignment[var]=value
-                #inferences = self.inference(var, assignment)
-                #if inferences:
-                    #assignment.update(inferences)
+        for value in self.order_domain_values(var, assignment):
+            if not self.consistent_with(var, value, assignment):
+                continue
+            assignment[var] = value
+            self.used[value] = var
+            mark = len(self.trail)
+            if self.inference(var, assignment):
                 result = self.backtrack(assignment)
                 if result is not None:
                     return result
-            #assignment.pop(var)
-            #else:
-            #    assignment.pop(var)
-            #    for variable in inferences:
-            #        assignment.pop(variable)
+            self.undo(mark)
+            del self.used[value]
+            del assignment[var]
         return None
 
+    def conflicts(self, var, value, assignment):
+        """
+        Return the assigned variables that rule out assigning `value` to
+        `var`: the one already using the word, any neighbor whose letter
+        differs where they overlap, or those of a matching nogood, which
+        may be none at all if the nogood is about `var` alone. Return None
+        if nothing rules the word out.
+        """
+        culprits = set()
+        if value in self.used:
+            culprits.add(self.used[value])
+        for neighbor in self.crossword.neighbors(var):
+            if neighbor in assignment:
+                i, j = self.crossword.overlaps[var, neighbor]
+                if value[i] != assignment[neighbor][j]:
+                    culprits.add(neighbor)
+        if culprits:
+            return culprits
+        return self.nogoods.conflict(var, value, assignment)
+
+    def unassign(self, var, assignment, mark):
+        """Undo the assignment of `var` and the propagation it caused."""
+        self.undo(mark)
+        del self.used[assignment[var]]
+        del assignment[var]
+
+    def backjump(self, assignment):
+        """
+        Search by conflict-directed backjumping, maintaining arc
+        consistency as `backtrack` does.
+
+        Return (solution, None) if `assignment` extends to a complete
+        assignment. Otherwise return (None, conflict set): the assigned
+        variables whose words together leave no solution. A variable that
+        is not in the conflict set returned from below it tries no more
+        words, since they cannot help; the search jumps back to the most
+        recent variable in the set. Small conflict sets are learned as
+        nogoods.
+        """
+        self.nodes += 1
+        self.check_deadline()
+        if self.assignment_complete(assignment):
+            return assignment, None
+        var = self.select_unassigned_variable(assignment)
 
-def main():
+        # Words missing from the domain were removed because of these
+        conflict = set(self.causes[var])
+        for value in self.order_domain_values(var, assignment):
+            culprits = self.conflicts(var, value, assignment)
+            if culprits is not None:
+                conflict |= culprits
+                continue
+            assignment[var] = value
+            self.used[value] = var
+            mark = len(self.trail)
+            if self.inference(var, assignment):
+                result, below = self.backjump(assignment)
+                if result is not None:
+                    return result, None
+                if var not in below:
+                    self.unassign(var, assignment, mark)
+                    self.backjumps += 1
+                    return None, below
+                conflict |= below - {var}
+            else:
+                conflict |= self.causes[self.wiped] - {var}
+            self.unassign(var, assignment, mark)
+
+        self.nogoods.add(frozenset(
+            (other, assignment[other]) for other in conflict
+        ))
+        return None, conflict
 
-    # Check usage
-    if len(sys.argv) not in [3, 4]:
-        sys.exit("Usage: python generate.py structure words [output]")
+
+def main():
 
     # Parse command-line arguments
-    structure = sys.argv[1]
-    words = sys.argv[2]
-    output = sys.argv[3] if len(sys.argv) == 4 else None
+    parser = argparse.ArgumentParser(
+        usage="python generate.py structure words [output]"
+    )
+    parser.add_argument("structure")
+    parser.add_argument("words")
+    parser.add_argument("output", nargs="?")
+    parser.add_argument("--search", choices=["backtrack", "cbj"],
+                        default="backtrack",
+                        help="chronological backtracking with arc "
+                             "consistency, or conflict-directed backjumping")
+    parser.add_argument("--compare", action="store_true",
+                        help="also solve with the other search and compare "
+                             "nodes explored")
+    args = parser.parse_args()
 
     # Generate crossword
-    crossword = Crossword(structure, words)
+    crossword = Crossword(args.structure, args.words)
     creator = CrosswordCreator(crossword)
-    assignment = creator.solve()
+    assignment = creator.solve(search=args.search)
 
     # Print result
     if assignment is None:
         print("No solution.")
     else:
         creator.print(assignment)
-        if output:
-            creator.save(assignment, output)
+        if args.output:
+            creator.save(assignment, args.output)
+    print(f"Nodes explored: {creator.nodes}, "
+          f"propagation time: {creator.propagation_seconds:.4f}s")
+    if args.search == "cbj":
+        print(f"Backjumps: {creator.backjumps}, "
+              f"nogood hits: {creator.nogoods.hits}, "
+              f"nogoods kept: {len(creator.nogoods)}")
+
+    if args.compare:
+        other = "cbj" if args.search == "backtrack" else "backtrack"
+        rival = CrosswordCreator(crossword)
+        solved = rival.solve(search=other) is not None
+        print(f"{args.search}: {creator.nodes} nodes; "
+              f"{other}: {rival.nodes} nodes "
+              f"({'solved' if solved else 'no solution'})")
 
 
 if __name__ == "__main__":
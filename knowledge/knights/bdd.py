@@ -0,0 +1,320 @@
+import sys
+
+from logic import (
+    And, Biconditional, Implication, Not, Or, Symbol,
+    order_symbols
+)
+
+
+def appearance_order(*sentences):
+    """Returns symbol names in the order they are first met, left to right."""
+    order = []
+    seen = set()
+    stack = list(reversed(sentences))
+    while stack:
+        sentence = stack.pop()
+        if isinstance(sentence, Symbol):
+            if sentence.name not in seen:
+                seen.add(sentence.name)
+                order.append(sentence.name)
+        else:
+            stack.extend(reversed(sentence.operands()))
+    return order
+
+
+# Variable ordering heuristics, by name
+ORDERINGS = {
+    "frequency": order_symbols,
+    "appearance": appearance_order,
+    "alphabetical": lambda *sentences: sorted(
+        set().union(*[sentence.symbols() for sentence in sentences])
+    ),
+}
+
+
+class BDD():
+    """
+    Reduced ordered binary decision diagrams for logical sentences.
+
+    Nodes are integers. 0 and 1 are the FALSE and TRUE terminals; every
+    other node tests one variable and has a low (false) and a high (true)
+    child. A unique table keeps the diagram reduced, and an operation cache
+    makes repeated applies on the same operands constant time, so one
+    compiled knowledge base can answer many queries cheaply.
+    """
+
+    FALSE = 0
+    TRUE = 1
+
+    def __init__(self, *sentences, heuristic="frequency"):
+        """
+        Create a diagram manager whose variable order is chosen by
+        `heuristic` over `sentences`. `heuristic` is a name from ORDERINGS
+        or a function taking sentences and returning symbol names.
+        Symbols met later are placed after the ordered ones.
+        """
+        if not callable(heuristic):
+            heuristic = ORDERINGS[heuristic]
+        self.order = []
+        self.levels = dict()
+
+        # Parallel node arrays; terminals sit below every variable
+        self.node_level = [sys.maxsize, sys.maxsize]
+        self.node_low = [None, None]
+        self.node_high = [None, None]
+
+        self.unique = dict()
+        self.cache = dict()
+        self.compiled = dict()
+
+        for name in heuristic(*sentences) if sentences else []:
+            self.declare(name)
+
+    def declare(self, name):
+        """Adds a variable at the bottom of the order, if not present."""
+        if name not in self.levels:
+            self.levels[name] = len(self.order)
+            self.order.append(name)
+
+    def mk(self, level, low, high):
+        """Returns the reduced node testing `level` with the given children."""
+        if low == high:
+            return low
+        key = (level, low, high)
+        node = self.unique.get(key)
+        if node is None:
+            node = len(self.node_level)
+            self.node_level.append(level)
+            self.node_low.append(low)
+            self.node_high.append(high)
+            self.unique[key] = node
+        return node
+
+    def var(self, name):
+        """Returns the node for a single variable."""
+        self.declare(name)
+        return self.mk(self.levels[name], BDD.FALSE, BDD.TRUE)
+
+    def negate(self, u):
+        """Returns the node for the negation of `u`."""
+        if u <= 1:
+            return 1 - u
+        key = ("not", u)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.mk(
+                self.node_level[u],
+                self.negate(self.node_low[u]),
+                self.negate(self.node_high[u])
+            )
+            self.cache[key] = result
+        return result
+
+    def apply(self, op, u, v):
+        """
+        Returns the node for `u op v`, where `op` is one of
+        "and", "or", "implies" or "iff".
+        """
+        if u <= 1 and v <= 1:
+            if op == "and":
+                return u & v
+            if op == "or":
+                return u | v
+            if op == "implies":
+                return (1 - u) | v
+            return int(u == v)
+
+        # Shortcuts that avoid recursing into the other operand
+        if op == "and":
+            if u == BDD.FALSE or v == BDD.FALSE:
+                return BDD.FALSE
+            if u == BDD.TRUE or u == v:
+                return v
+            if v == BDD.TRUE:
+                return u
+        elif op == "or":
+            if u == BDD.TRUE or v == BDD.TRUE:
+                return BDD.TRUE
+            if u == BDD.FALSE or u == v:
+                return v
+            if v == BDD.FALSE:
+                return u
+        elif op == "implies":
+            if u == BDD.FALSE or v == BDD.TRUE or u == v:
+                return BDD.TRUE
+            if u == BDD.TRUE:
+                return v
+
+        key = (op, u, v)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+
+        level_u = self.node_level[u]
+        level_v = self.node_level[v]
+        level = min(level_u, level_v)
+        if level_u == level:
+            u_low, u_high = self.node_low[u], self.node_high[u]
+        else:
+            u_low = u_high = u
+        if level_v == level:
+            v_low, v_high = self.node_low[v], self.node_high[v]
+        else:
+            v_low = v_high = v
+        result = self.mk(
+            level,
+            self.apply(op, u_low, v_low),
+            self.apply(op, u_high, v_high)
+        )
+        self.cache[key] = result
+        return result
+
+    def compile(self, sentence):
+        """Returns the node representing a logical sentence."""
+        node = self.compiled.get(sentence)
+        if node is not None:
+            return node
+        if isinstance(sentence, Symbol):
+            node = self.var(sentence.name)
+        elif isinstance(sentence, Not):
+            node = self.negate(self.compile(sentence.operand))
+        elif isinstance(sentence, And):
+            node = BDD.TRUE
+            for conjunct in sentence.conjuncts:
+                node = self.apply("and", node, self.compile(conjunct))
+                if node == BDD.FALSE:
+                    break
+        elif isinstance(sentence, Or):
+            node = BDD.FALSE
+            for disjunct in sentence.disjuncts:
+                node = self.apply("or", node, self.compile(disjunct))
+                if node == BDD.TRUE:
+                    break
+        elif isinstance(sentence, Implication):
+            node = self.apply(
+                "implies",
+                self.compile(sentence.antecedent),
+                self.compile(sentence.consequent)
+            )
+        elif isinstance(sentence, Biconditional):
+            node = self.apply(
+                "iff",
+                self.compile(sentence.left),
+                self.compile(sentence.right)
+            )
+        else:
+            raise TypeError("must be a logical sentence")
+
+        # Conjunctions can grow in place, so sentences containing one are
+        # not memoized
+        if not sentence.mutable():
+            self.compiled[sentence] = node
+        return node
+
+    def _node(self, u):
+        """Compiles `u` if it is a sentence rather than a node."""
+        return u if isinstance(u, int) else self.compile(u)
+
+    def entails(self, knowledge, query):
+        """Checks if `knowledge` entails `query` (sentences or nodes)."""
+        knowledge = self._node(knowledge)
+        query = self._node(query)
+        return self.apply("implies", knowledge, query) == BDD.TRUE
+
+    def count(self, u):
+        """Returns the exact number of models of `u` over declared variables."""
+        u = self._node(u)
+        n = len(self.order)
+        memo = dict()
+
+        def level(node):
+            return n if node <= 1 else self.node_level[node]
+
+        def count_from(node):
+            """Counts models over the variables from the node's level down."""
+            if node <= 1:
+                return node
+            if node not in memo:
+                low = self.node_low[node]
+                high = self.node_high[node]
+                memo[node] = (
+                    2 ** (level(low) - level(node) - 1) * count_from(low)
+                    + 2 ** (level(high) - level(node) - 1) * count_from(high)
+                )
+            return memo[node]
+
+        return 2 ** level(u) * count_from(u)
+
+    def models(self, u):
+        """
+        Yields every satisfying assignment of `u` as a dict over all
+        declared variables, lazily.
+        """
+        u = self._node(u)
+        n = len(self.order)
+
+        def walk(node, level, model):
+            if node == BDD.FALSE:
+                return
+            node_level = n if node == BDD.TRUE else self.node_level[node]
+
+            # Variables skipped by the diagram may take either value
+            if level < node_level:
+                name = self.order[level]
+                for value in (False, True):
+                    model[name] = value
+                    yield from walk(node, level + 1, model)
+                del model[name]
+            elif node == BDD.TRUE:
+                yield dict(model)
+            else:
+                name = self.order[level]
+                model[name] = False
+                yield from walk(self.node_low[node], level + 1, model)
+                model[name] = True
+                yield from walk(self.node_high[node], level + 1, model)
+                del model[name]
+
+        yield from walk(u, 0, dict())
+
+    def size(self, u):
+        """Returns the number of nodes reachable from `u`, terminals included."""
+        u = self._node(u)
+        seen = set()
+        stack = [u]
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            if node > 1:
+                stack.append(self.node_low[node])
+                stack.append(self.node_high[node])
+        return len(seen)
+
+    def memory(self):
+        """
+        Reports the size of the node table and caches, with an estimate of
+        the bytes held by their containers.
+        """
+        tables = (
+            self.node_level, self.node_low, self.node_high,
+            self.unique, self.cache, self.compiled
+        )
+        return {
+            "variables": len(self.order),
+            "nodes": len(self.node_level),
+            "unique_table": len(self.unique),
+            "apply_cache": len(self.cache),
+            "bytes": sum(sys.getsizeof(table) for table in tables),
+        }
+
+    def clear_cache(self):
+        """Drops the operation cache; compiled nodes stay valid."""
+        self.cache.clear()
+
+
+def bdd_check(knowledge, query, heuristic="frequency"):
+    """Checks if knowledge base entails query by compiling both to a BDD."""
+    bdd = BDD(knowledge, query, heuristic=heuristic)
+    return bdd.entails(knowledge, query)
@@ -0,0 +1,219 @@
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from bdd import BDD
+from logic import (
+    And, Implication, Not, Or, Symbol,
+    check_all, horn_check, horn_clauses, model_check,
+    model_check_parallel, normalized, order_symbols
+)
+
+
+def random_cnf(n, seed, k=3, ratio=4.0):
+    """Returns a random k-CNF knowledge base over n symbols, and a query."""
+    rng = random.Random(seed)
+    symbols = [Symbol(f"x{i}") for i in range(n)]
+    clauses = []
+    for _ in range(max(1, int(ratio * n))):
+        literals = rng.sample(symbols, min(k, n))
+        clauses.append(Or(*[
+            literal if rng.random() < 0.5 else Not(literal)
+            for literal in literals
+        ]))
+    return And(*clauses), rng.choice(symbols)
+
+
+def random_horn(n, seed, ratio=2.0):
+    """
+    Returns a random Horn knowledge base over n symbols, and a query.
+    Rules have up to three premises; a few symbols are given as facts.
+    """
+    rng = random.Random(seed)
+    symbols = [Symbol(f"h{i}") for i in range(n)]
+    clauses = rng.sample(symbols, max(1, n // 10))
+    for _ in range(max(1, int(ratio * n))):
+        premises = rng.sample(symbols, rng.randint(1, min(3, n)))
+        antecedent = premises[0] if len(premises) == 1 else And(*premises)
+        clauses.append(Implication(antecedent, rng.choice(symbols)))
+    return And(*clauses), rng.choice(symbols)
+
+
+def knights_and_knaves(n, seed):
+    """
+    Returns a knights-and-knaves puzzle with n characters, and a query.
+    Every character is exactly one of knight or knave, and makes one
+    statement about two others, true if and only if they are a knight.
+    """
+    rng = random.Random(seed)
+    knights = [Symbol(f"C{i} is a Knight") for i in range(n)]
+    knaves = [Symbol(f"C{i} is a Knave") for i in range(n)]
+    knowledge = []
+    for i in range(n):
+        knowledge.append(Or(knights[i], knaves[i]))
+        knowledge.append(Not(And(knights[i], knaves[i])))
+
+        # C_i says something about two characters
+        a, b = rng.choice(range(n)), rng.choice(range(n))
+        about_a = knights[a] if rng.random() < 0.5 else knaves[a]
+        about_b = knights[b] if rng.random() < 0.5 else knaves[b]
+        statement = rng.choice([And, Or])(about_a, about_b)
+        knowledge.append(Implication(knights[i], statement))
+        knowledge.append(Implication(knaves[i], Not(statement)))
+    return And(*knowledge), rng.choice(knights + knaves)
+
+
+GENERATORS = {
+    "cnf": random_cnf,
+    "horn": random_horn,
+    "knights": knights_and_knaves,
+}
+
+
+def run_enumeration(knowledge, query):
+    """Plain partial-model enumeration, without the Horn fast path."""
+    knowledge = normalized(knowledge)
+    query = normalized(query)
+    stats = {"pruned": 0, "models": 0}
+    symbols = order_symbols(knowledge, query)
+    return check_all(knowledge, query, symbols, dict(), stats), stats
+
+
+def run_model_check(knowledge, query):
+    """model_check as callers see it, Horn fast path included."""
+    stats = dict()
+    return model_check(knowledge, query, stats), stats
+
+
+def run_parallel(knowledge, query):
+    stats = dict()
+    return model_check_parallel(knowledge, query, stats=stats), stats
+
+
+def run_bdd(knowledge, query):
+    bdd = BDD(knowledge, query)
+    entailed = bdd.entails(knowledge, query)
+    return entailed, {"nodes": bdd.memory()["nodes"]}
+
+
+def run_horn(knowledge, query):
+    clauses = horn_clauses(knowledge)
+    if clauses is None:
+        return None, {}
+    return horn_check(clauses, query), {"clauses": len(clauses)}
+
+
+BACKENDS = {
+    "enumeration": run_enumeration,
+    "model_check": run_model_check,
+    "parallel": run_parallel,
+    "bdd": run_bdd,
+    "horn": run_horn,
+}
+
+
+def measure(backend, knowledge, query):
+    """
+    Runs a backend once for time and once under tracemalloc for peak
+    memory (of this process only). Returns a result record.
+    """
+    start = time.perf_counter()
+    entailed, stats = BACKENDS[backend](knowledge, query)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    BACKENDS[backend](knowledge, query)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "backend": backend,
+        "entailed": entailed,
+        "seconds": seconds,
+        "peak_bytes": peak,
+        "models": stats.get("models"),
+        "stats": stats,
+    }
+
+
+def benchmark(families, sizes, backends, seed=0, limit=10.0):
+    """
+    Times every backend on every family and size, and checks that the
+    backends agree. A backend that takes longer than `limit` seconds on a
+    family is not run on the larger sizes of that family.
+    """
+    results = []
+    for family in families:
+        stopped = set()
+        for n in sizes:
+            knowledge, query = GENERATORS[family](n, seed)
+            records = []
+            for backend in backends:
+                if backend in stopped:
+                    continue
+                record = measure(backend, knowledge, query)
+                if record["entailed"] is None:
+                    continue
+                record.update(family=family, symbols=len(
+                    knowledge.symbols() | query.symbols()
+                ), size=n)
+                records.append(record)
+                if record["seconds"] > limit:
+                    stopped.add(backend)
+            verdicts = set(record["entailed"] for record in records)
+            for record in records:
+                record["agree"] = len(verdicts) <= 1
+            results.extend(records)
+    return results
+
+
+def print_table(results):
+    columns = [
+        ("family", 8), ("size", 5), ("symbols", 8), ("backend", 12),
+        ("entailed", 9), ("seconds", 10), ("models", 10),
+        ("peak_bytes", 11), ("agree", 6)
+    ]
+    print(" ".join(name.ljust(width) for name, width in columns))
+    for record in results:
+        cells = []
+        for name, width in columns:
+            value = record[name]
+            if name == "seconds":
+                value = f"{value:.5f}"
+            elif value is None:
+                value = "-"
+            cells.append(str(value).ljust(width))
+        print(" ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the logic entailment backends."
+    )
+    parser.add_argument("--families", nargs="+", default=list(GENERATORS),
+                        choices=list(GENERATORS))
+    parser.add_argument("--sizes", nargs="+", type=int,
+                        default=[4, 8, 12, 16, 20])
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS),
+                        choices=list(BACKENDS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--limit", type=float, default=10.0,
+                        help="seconds after which a backend stops scaling")
+    parser.add_argument("--json", help="file to write the results to")
+    args = parser.parse_args()
+
+    results = benchmark(args.families, args.sizes, args.backends,
+                        seed=args.seed, limit=args.limit)
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if not all(record["agree"] for record in results):
+        sys.exit("Backends disagree.")
+
+
+if __name__ == "__main__":
+    main()
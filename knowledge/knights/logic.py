@@ -1,19 +1,128 @@
 import itertools
+import multiprocessing
+import os
+import weakref
 
 
 class Sentence():
+    """
+    Base class of logical sentences.
+
+    Sentences are hash-consed: constructing a sentence whose operands are
+    the same objects as those of a live sentence of the same class returns
+    that sentence, so structurally equal subtrees are a single object.
+    Conjunctions are the exception, since `And.add` changes them in place.
+    Each node computes its hash and symbol set once, and its formula on
+    first use. A node containing a conjunction recomputes them after any
+    `And.add`, since the conjunction may have changed under it.
+    """
+
+    __slots__ = (
+        "_hash", "_symbols", "_formula", "_stable", "_cached_at",
+        "__weakref__"
+    )
+
+    # Live sentences, keyed by class and the identities of their operands
+    _interned = weakref.WeakValueDictionary()
+
+    # Number of calls to And.add so far
+    _mutations = 0
+
+    @classmethod
+    def _intern(cls, key):
+        """
+        Returns (sentence, created): the live sentence of this class
+        registered under `key`, or a new, unfilled one registered under it.
+        """
+        sentence = Sentence._interned.get((cls, key))
+        if sentence is not None:
+            return sentence, False
+        sentence = object.__new__(cls)
+        Sentence._interned[cls, key] = sentence
+        return sentence, True
+
+    @classmethod
+    def _operand_key(cls, operands):
+        """Returns the intern key of a sentence built from `operands`."""
+        return tuple(id(operand) for operand in operands)
+
+    def _fill(self):
+        """
+        Computes the cached data of a new node; it stays valid for good
+        unless the node contains a conjunction.
+        """
+        self._stable = not isinstance(self, And) and all(
+            operand._stable for operand in self.operands()
+        )
+        self._refresh()
+
+    def _refresh(self):
+        self._hash = self._compute_hash()
+        self._symbols = self._compute_symbols()
+        self._formula = None
+        self._cached_at = Sentence._mutations
+
+    def _check(self):
+        """Recomputes cached data that an And.add may have made stale."""
+        if not self._stable and self._cached_at != Sentence._mutations:
+            self._refresh()
+
+    def _compute_hash(self):
+        return hash((type(self).__name__, tuple(
+            hash(operand) for operand in self.operands()
+        )))
+
+    def _compute_symbols(self):
+        return frozenset().union(
+            *[operand.symbols() for operand in self.operands()]
+        )
+
+    def __hash__(self):
+        self._check()
+        return self._hash
+
+    def mutable(self):
+        """
+        Checks if the sentence contains a conjunction, which `And.add`
+        can change in place.
+        """
+        return not self._stable
+
+    def __reduce__(self):
+        # Rebuild through the constructor so unpickled sentences are
+        # interned, and hashes are recomputed in the receiving process
+        return (type(self), tuple(self.operands()))
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """
+        Evaluates the logical sentence under a partial model.
+        Returns True or False if the value is already decided by the
+        assigned symbols, or None if it depends on unassigned ones.
+        """
+        raise Exception("nothing to evaluate")
+
+    def operands(self):
+        """Returns a list of the immediate subsentences."""
+        return []
+
     def formula(self):
         """Returns string formula representing logical sentence."""
+        self._check()
+        if self._formula is None:
+            self._formula = self._build_formula()
+        return self._formula
+
+    def _build_formula(self):
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozenset of all symbols in the logical sentence."""
+        self._check()
+        return self._symbols
 
     @classmethod
     def validate(cls, sentence):
@@ -44,15 +153,31 @@ class Sentence():
 
 class Symbol(Sentence):
 
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ("name",)
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+    def __new__(cls, name):
+        self, created = cls._intern(name)
+        if created:
+            self.name = name
+            self._fill()
+        return self
 
-    def __hash__(self):
+    def _compute_hash(self):
         return hash(("symbol", self.name))
 
+    def _compute_symbols(self):
+        return frozenset((self.name,))
+
+    def __eq__(self, other):
+        return self is other or (
+            isinstance(other, Symbol) and self.name == other.name
+        )
+
+    __hash__ = Sentence.__hash__
+
+    def __reduce__(self):
+        return (Symbol, (self.name,))
+
     def __repr__(self):
         return self.name
 
@@ -62,23 +187,35 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
-    def formula(self):
-        return self.name
+    def evaluate_partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
 
-    def symbols(self):
-        return {self.name}
+    def _build_formula(self):
+        return self.name
 
 
 class Not(Sentence):
-    def __init__(self, operand):
+
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
         Sentence.validate(operand)
-        self.operand = operand
+        self, created = cls._intern(id(operand))
+        if created:
+            self.operand = operand
+            self._fill()
+        return self
+
+    def _compute_hash(self):
+        return hash(("not", hash(self.operand)))
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or (
+            isinstance(other, Not) and self.operand == other.operand
+        )
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,27 +223,44 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
-    def formula(self):
-        return "¬" + Sentence.parenthesize(self.operand.formula())
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
 
-    def symbols(self):
-        return self.operand.symbols()
+    def operands(self):
+        return [self.operand]
+
+    def _build_formula(self):
+        return "¬" + Sentence.parenthesize(self.operand.formula())
 
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+
+    __slots__ = ("conjuncts",)
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        # Never shared, so that adding to one knowledge base cannot change
+        # another that happens to have been built the same way
+        self = object.__new__(cls)
+        self.conjuncts = list(conjuncts)
+        self._fill()
+        return self
 
-    def __hash__(self):
+    def _compute_hash(self):
         return hash(
             ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
         )
 
+    def __eq__(self, other):
+        return self is other or (
+            isinstance(other, And) and self.conjuncts == other.conjuncts
+        )
+
+    __hash__ = Sentence.__hash__
+
     def __repr__(self):
         conjunctions = ", ".join(
             [str(conjunct) for conjunct in self.conjuncts]
@@ -114,36 +268,62 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
+        """
+        Adds a conjunct in place. Every sentence containing a conjunction
+        recomputes its hash, symbols and formula on next use.
+        """
         Sentence.validate(conjunct)
         self.conjuncts.append(conjunct)
+        Sentence._mutations += 1
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
-    def formula(self):
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
+    def operands(self):
+        return list(self.conjuncts)
+
+    def _build_formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
-
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        self, created = cls._intern(cls._operand_key(disjuncts))
+        if created:
+            self.disjuncts = list(disjuncts)
+            self._fill()
+        return self
 
-    def __hash__(self):
+    def _compute_hash(self):
         return hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
         )
 
+    def __eq__(self, other):
+        return self is other or (
+            isinstance(other, Or) and self.disjuncts == other.disjuncts
+        )
+
+    __hash__ = Sentence.__hash__
+
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
@@ -151,30 +331,53 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
-    def formula(self):
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
+    def operands(self):
+        return list(self.disjuncts)
+
+    def _build_formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
-
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+        self, created = cls._intern((id(antecedent), id(consequent)))
+        if created:
+            self.antecedent = antecedent
+            self.consequent = consequent
+            self._fill()
+        return self
+
+    def _compute_hash(self):
+        return hash(
+            ("implies", hash(self.antecedent), hash(self.consequent))
+        )
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (
+            isinstance(other, Implication)
+            and self.antecedent == other.antecedent
+            and self.consequent == other.consequent
+        )
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,29 +386,53 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
-    def formula(self):
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is True and consequent is False:
+            return False
+        return None
+
+    def operands(self):
+        return [self.antecedent, self.consequent]
+
+    def _build_formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
-
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
+        self, created = cls._intern((id(left), id(right)))
+        if created:
+            self.left = left
+            self.right = right
+            self._fill()
+        return self
+
+    def _compute_hash(self):
+        return hash(
+            ("biconditional", hash(self.left), hash(self.right))
+        )
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (
+            isinstance(other, Biconditional)
+            and self.left == other.left
+            and self.right == other.right
+        )
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,48 +443,642 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
-    def formula(self):
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
+
+    def operands(self):
+        return [self.left, self.right]
+
+    def _build_formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
-
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
 
-        # If model has an assignment for each symbol
-        if not symbols:
+def symbol_frequencies(*sentences):
+    """
+    Returns a dict mapping each symbol name to the number of times it
+    occurs across `sentences`.
+    """
+    counts = {}
+    stack = list(sentences)
+    while stack:
+        sentence = stack.pop()
+        if isinstance(sentence, Symbol):
+            counts[sentence.name] = counts.get(sentence.name, 0) + 1
+        else:
+            stack.extend(sentence.operands())
+    return counts
+
+
+def order_symbols(*sentences):
+    """
+    Returns the symbol names of `sentences`, most frequent first.
+    Ties are broken by name so the order is deterministic.
+    """
+    counts = symbol_frequencies(*sentences)
+    return sorted(counts, key=lambda name: (-counts[name], name))
+
+
+def size(sentence):
+    """Returns the number of nodes in a sentence, counting repeats."""
+    count = 0
+    stack = [sentence]
+    while stack:
+        count += 1
+        stack.extend(stack.pop().operands())
+    return count
+
+
+def is_true(sentence):
+    """Checks if a sentence is the empty conjunction, which is always true."""
+    return isinstance(sentence, And) and not sentence.conjuncts
+
+
+def is_false(sentence):
+    """Checks if a sentence is the empty disjunction, which is always false."""
+    return isinstance(sentence, Or) and not sentence.disjuncts
+
+
+def simplify(sentence, stats=None):
+    """
+    Returns an equivalent sentence that is cheaper to evaluate.
+
+    Nested conjunctions and disjunctions are flattened and their duplicate
+    operands removed, implications become disjunctions, negations are
+    pushed inward onto symbols, and constants are folded: an empty And()
+    is true, an empty Or() is false, and x ∧ ¬x or x ∨ ¬x collapse to
+    them. If `stats` is a dict, the size of the sentence "before" and
+    "after" is recorded in it.
+    """
+    memo = dict()
+
+    def junction(conjunction, parts):
+        """Builds a flattened, deduplicated And (or Or) from `parts`."""
+        kind = And if conjunction else Or
+        absorbing = is_false if conjunction else is_true
+        operands = []
+        seen = set()
+        for part in parts:
+            if absorbing(part):
+                return part
+            nested = (
+                part.conjuncts if conjunction and isinstance(part, And)
+                else part.disjuncts if not conjunction and isinstance(part, Or)
+                else [part]
+            )
+            for operand in nested:
+                if operand in seen:
+                    continue
+                complement = (operand.operand if isinstance(operand, Not)
+                              else Not(operand))
+                if complement in seen:
+                    return Or() if conjunction else And()
+                seen.add(operand)
+                operands.append(operand)
+        if len(operands) == 1:
+            return operands[0]
+        return kind(*operands)
+
+    def biconditional(left, right):
+        """Builds left <=> right, folding constants and equal sides."""
+        for side, other in ((left, right), (right, left)):
+            if is_true(side):
+                return other
+            if is_false(side):
+                return rewrite(other, True)
+        if left == right:
+            return And()
+        if left == rewrite(right, True):
+            return Or()
+        return Biconditional(left, right)
+
+    def rewrite(sentence, negated):
+        """Returns the simplified form of `sentence`, or of its negation."""
+        key = (id(sentence), negated)
+        if key in memo:
+            return memo[key][1]
+        if isinstance(sentence, Symbol):
+            result = Not(sentence) if negated else sentence
+        elif isinstance(sentence, Not):
+            result = rewrite(sentence.operand, not negated)
+        elif isinstance(sentence, And):
+            result = junction(not negated, [
+                rewrite(conjunct, negated) for conjunct in sentence.conjuncts
+            ])
+        elif isinstance(sentence, Or):
+            result = junction(negated, [
+                rewrite(disjunct, negated) for disjunct in sentence.disjuncts
+            ])
+        elif isinstance(sentence, Implication):
+            result = junction(negated, [
+                rewrite(sentence.antecedent, not negated),
+                rewrite(sentence.consequent, negated)
+            ])
+        elif isinstance(sentence, Biconditional):
+            result = biconditional(
+                rewrite(sentence.left, False),
+                rewrite(sentence.right, negated)
+            )
+        else:
+            raise TypeError("must be a logical sentence")
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
+        # Keep the sentence alive so its id is not reused during the pass
+        memo[key] = (sentence, result)
+        return result
+
+    result = rewrite(sentence, False)
+    if stats is not None:
+        stats["before"] = size(sentence)
+        stats["after"] = size(result)
+    return result
+
+
+def normalized(sentence):
+    """
+    Returns the simplified sentence, unless pushing negations inward made
+    it larger than the original, in which case the original is returned.
+    """
+    stats = dict()
+    simplified = simplify(sentence, stats)
+    return simplified if stats["after"] <= stats["before"] else sentence
+
+
+def horn_clauses(knowledge):
+    """
+    Returns the knowledge base as a list of Horn clauses, or None if it is
+    not in Horn form.
+
+    Each clause is a pair (premises, conclusion): a tuple of symbol names
+    whose conjunction implies the symbol named `conclusion`. Facts have no
+    premises, and goal clauses, such as ¬p or ¬p ∨ ¬q, have conclusion
+    None, meaning their premises cannot all be true.
+    """
+    clauses = []
+
+    def symbol_names(sentence):
+        """Returns the names of a conjunction of symbols, or None."""
+        names = []
+        for conjunct in conjuncts_of(sentence):
+            if not isinstance(conjunct, Symbol):
+                return None
+            names.append(conjunct.name)
+        return names
+
+    for conjunct in conjuncts_of(knowledge):
+        if isinstance(conjunct, Symbol):
+            clauses.append(((), conjunct.name))
+        elif (isinstance(conjunct, Not)
+              and isinstance(conjunct.operand, Symbol)):
+            clauses.append(((conjunct.operand.name,), None))
+        elif isinstance(conjunct, Implication):
+            premises = symbol_names(conjunct.antecedent)
+            conclusions = symbol_names(conjunct.consequent)
+            if premises is None or conclusions is None:
+                return None
+            for conclusion in conclusions:
+                clauses.append((tuple(premises), conclusion))
+        elif isinstance(conjunct, Or):
+            premises = []
+            conclusion = None
+            for disjunct in conjunct.disjuncts:
+                if (isinstance(disjunct, Not)
+                        and isinstance(disjunct.operand, Symbol)):
+                    premises.append(disjunct.operand.name)
+                elif isinstance(disjunct, Symbol) and conclusion is None:
+                    conclusion = disjunct.name
+                else:
+                    return None
+            clauses.append((tuple(premises), conclusion))
+        else:
+            return None
+    return clauses
+
+
+def forward_chain(clauses, query=None):
+    """
+    Checks if Horn clauses entail the symbol named `query`, in time linear
+    in the size of the clauses (PL-FC-ENTAILS). Also returns True when the
+    clauses are inconsistent, as they then entail anything; with `query`
+    None, that is the only case that returns True.
+    """
+    count = []
+    watching = dict()
+    agenda = []
+    for index, (premises, conclusion) in enumerate(clauses):
+        premises = set(premises)
+        count.append(len(premises))
+        for premise in premises:
+            watching.setdefault(premise, []).append(index)
+        if not premises:
+            if conclusion is None:
+                return True
+            agenda.append(conclusion)
+
+    inferred = set()
+    while agenda:
+        p = agenda.pop()
+        if p == query:
             return True
+        if p in inferred:
+            continue
+        inferred.add(p)
+        for index in watching.get(p, ()):
+            count[index] -= 1
+            if count[index] == 0:
+                conclusion = clauses[index][1]
+                if conclusion is None:
+                    return True
+                agenda.append(conclusion)
+    return False
+
+
+def horn_check(clauses, query):
+    """
+    Decides entailment of a symbol or negated symbol from Horn clauses.
+    Returns None for any other query.
+    """
+    if isinstance(query, Symbol):
+        return forward_chain(clauses, query.name)
+
+    # KB entails ¬q exactly when KB ∧ q is inconsistent
+    if isinstance(query, Not) and isinstance(query.operand, Symbol):
+        return forward_chain(clauses + [((), query.operand.name)])
+    return None
+
+
+def check_all(knowledge, query, symbols, model, stats):
+    """
+    Checks if knowledge base entails query, given a particular model.
+
+    `symbols` lists the unassigned symbols in the order to assign them.
+    Counts of "pruned" subtrees and complete "models" visited are added
+    to `stats`.
+    """
+
+    # If knowledge base is false in model, entailment holds trivially
+    kb_value = knowledge.evaluate_partial(model)
+    if kb_value is False:
+        if symbols:
+            stats["pruned"] += 1
         else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+            stats["models"] += 1
+        return True
+
+    # If knowledge base is true in model, query decides the branch
+    if kb_value is True:
+        query_value = query.evaluate_partial(model)
+        if query_value is not None:
+            if symbols:
+                stats["pruned"] += 1
+            else:
+                stats["models"] += 1
+            return query_value
+
+    # Choose the most frequent of the remaining unused symbols
+    p = symbols[0]
+    remaining = symbols[1:]
+
+    # Ensure entailment holds when the symbol is true and when it is false
+    model[p] = True
+    if not check_all(knowledge, query, remaining, model, stats):
+        del model[p]
+        return False
+    model[p] = False
+    result = check_all(knowledge, query, remaining, model, stats)
+    del model[p]
+    return result
+
+
+def model_check(knowledge, query, stats=None, normalize=True):
+    """
+    Checks if knowledge base entails query.
+
+    Symbols are assigned most frequent first, and a branch is cut as soon
+    as the partial model decides the outcome: either the knowledge base is
+    already false, or knowledge => query is already true. If `stats` is a
+    dict, the number of "pruned" subtrees and complete "models" visited
+    are accumulated into it. With `normalize`, both sentences are first
+    passed through `normalized`.
+
+    Knowledge bases in Horn form, queried for a symbol or its negation,
+    are decided by forward chaining instead, in linear time.
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("pruned", 0)
+    stats.setdefault("models", 0)
+
+    clauses = horn_clauses(knowledge)
+    if clauses is not None:
+        entailed = horn_check(clauses, query)
+        if entailed is not None:
+            return entailed
+    if normalize:
+        knowledge = normalized(knowledge)
+        query = normalized(query)
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = order_symbols(knowledge, query)
 
     # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    return check_all(knowledge, query, symbols, dict(), stats)
+
+
+# Knowledge base and query shared by the workers of model_check_parallel
+_worker_problem = None
+
+
+def _init_worker(knowledge, query, symbols):
+    global _worker_problem
+    _worker_problem = (knowledge, query, symbols)
+
+
+def _check_cube(cube):
+    """Runs check_all on the sub-space where the symbols of `cube` are fixed."""
+    knowledge, query, symbols = _worker_problem
+    stats = {"pruned": 0, "models": 0}
+    return check_all(knowledge, query, symbols, dict(cube), stats), stats
+
+
+def model_check_parallel(knowledge, query, processes=None, split=None,
+                         stats=None, normalize=True):
+    """
+    Checks if knowledge base entails query using a pool of processes.
+
+    The first `split` symbols (most frequent first) are fixed to each of
+    their 2^split combinations, and every such cube is checked by a worker
+    running check_all on the remaining symbols. The first counter-model
+    found terminates every remaining worker. By default `split` gives
+    about four cubes per process. `stats` is filled in as for
+    `model_check`, from the cubes that finished, and `normalize` works
+    as it does there.
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("pruned", 0)
+    stats.setdefault("models", 0)
+    if normalize:
+        knowledge = normalized(knowledge)
+        query = normalized(query)
+
+    symbols = order_symbols(knowledge, query)
+    processes = processes or os.cpu_count() or 1
+    if split is None:
+        split = (4 * processes - 1).bit_length()
+    split = min(split, len(symbols))
+    prefix, remaining = symbols[:split], symbols[split:]
+    cubes = [
+        tuple(zip(prefix, values))
+        for values in itertools.product((True, False), repeat=split)
+    ]
+
+    with multiprocessing.Pool(
+        processes, initializer=_init_worker,
+        initargs=(knowledge, query, remaining)
+    ) as pool:
+        for entailed, cube_stats in pool.imap_unordered(_check_cube, cubes):
+            stats["pruned"] += cube_stats["pruned"]
+            stats["models"] += cube_stats["models"]
+            if not entailed:
+                pool.terminate()
+                return False
+    return True
+
+
+# Verdicts returned by model_check_all
+ENTAILED = "entailed"
+CONTRADICTED = "contradicted"
+UNKNOWN = "unknown"
+
+
+def model_check_all(knowledge, queries, stats=None, normalize=True):
+    """
+    Checks a list of queries against one knowledge base, enumerating the
+    models of the knowledge base only once.
+
+    Returns a dict mapping each query to ENTAILED if it is true in every
+    model of the knowledge base, CONTRADICTED if it is false in every
+    model, and UNKNOWN otherwise. An unsatisfiable knowledge base entails
+    every query. `stats` and `normalize` work as for `model_check`; the
+    returned dict is keyed by the queries as given.
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("pruned", 0)
+    stats.setdefault("models", 0)
+
+    queries = list(queries)
+
+    # Horn knowledge bases decide symbol queries by forward chaining
+    clauses = horn_clauses(knowledge)
+    if clauses is not None and all(
+        isinstance(query, Symbol) for query in queries
+    ):
+        verdicts = dict()
+        for query in queries:
+            if horn_check(clauses, query):
+                verdicts[query] = ENTAILED
+            elif horn_check(clauses, Not(query)):
+                verdicts[query] = CONTRADICTED
+            else:
+                verdicts[query] = UNKNOWN
+        return verdicts
+
+    if normalize:
+        knowledge = normalized(knowledge)
+        originals = queries
+        queries = [normalized(query) for query in originals]
+    else:
+        originals = queries
+    seen_true = set()
+    seen_false = set()
+
+    # Queries whose verdict can still change
+    open_queries = set(queries)
+
+    def check_all(symbols, model):
+        """Records query values in every model of the knowledge base."""
+
+        # Nothing below this model can contribute to an open query
+        kb_value = knowledge.evaluate_partial(model)
+        if kb_value is False:
+            if symbols:
+                stats["pruned"] += 1
+            else:
+                stats["models"] += 1
+            return
+
+        # Record every query the model already decides
+        if kb_value is True:
+            undecided = False
+            for query in list(open_queries):
+                value = query.evaluate_partial(model)
+                if value is None:
+                    undecided = True
+                    continue
+                (seen_true if value else seen_false).add(query)
+                if query in seen_true and query in seen_false:
+                    open_queries.discard(query)
+            if not undecided:
+                if symbols:
+                    stats["pruned"] += 1
+                else:
+                    stats["models"] += 1
+                return
+
+        # Choose the most frequent of the remaining unused symbols
+        p = symbols[0]
+        for value in (True, False):
+            if not open_queries:
+                break
+            model[p] = value
+            check_all(symbols[1:], model)
+        model.pop(p, None)
+
+    check_all(order_symbols(knowledge, *queries), dict())
+
+    verdicts = dict()
+    for original, query in zip(originals, queries):
+        if query in seen_true and query in seen_false:
+            verdicts[original] = UNKNOWN
+        elif query in seen_false:
+            verdicts[original] = CONTRADICTED
+        else:
+            verdicts[original] = ENTAILED
+    return verdicts
+
+
+def conjuncts_of(sentence):
+    """Returns the conjuncts of a sentence, flattening nested conjunctions."""
+    if not isinstance(sentence, And):
+        return [sentence]
+    conjuncts = []
+    for conjunct in sentence.conjuncts:
+        conjuncts.extend(conjuncts_of(conjunct))
+    return conjuncts
+
+
+def models(knowledge, symbols=None):
+    """
+    Yields every model of the knowledge base, lazily, as a dict mapping
+    each symbol name to a truth value. `symbols` optionally adds symbol
+    names that do not occur in the knowledge base.
+    """
+    names = order_symbols(knowledge)
+    if symbols is not None:
+        names += sorted(set(symbols) - set(names))
+
+    def enumerate_models(symbols, model):
+        value = knowledge.evaluate_partial(model)
+        if value is False:
+            return
+
+        # Every completion of a satisfying partial model is a model
+        if value is True:
+            for values in itertools.product((True, False),
+                                            repeat=len(symbols)):
+                completed = model.copy()
+                completed.update(zip(symbols, values))
+                yield completed
+            return
+
+        p = symbols[0]
+        for value in (True, False):
+            model[p] = value
+            yield from enumerate_models(symbols[1:], model)
+        del model[p]
+
+    yield from enumerate_models(names, dict())
+
+
+def count_models(knowledge, symbols=None):
+    """
+    Returns the number of models of the knowledge base, over its own
+    symbols plus any extra names in `symbols`.
+
+    The conjuncts still undecided under a partial model are split into
+    components that share no unassigned symbol; each component is counted
+    separately, and the counts are multiplied. Component counts are cached
+    by their conjuncts and the assignment to their symbols, so independent
+    subformulas never multiply the search.
+    """
+    cache = dict()
+
+    def count(constraints, model):
+        """
+        Counts assignments to the unassigned symbols of `constraints`
+        that satisfy all of them.
+        """
+        residual = []
+        for constraint in constraints:
+            value = constraint.evaluate_partial(model)
+            if value is False:
+                return 0
+            if value is None:
+                residual.append(constraint)
+
+        unassigned = set().union(
+            *[constraint.symbols() for constraint in constraints]
+        ) - model.keys()
+        constrained = set().union(
+            *[constraint.symbols() for constraint in residual]
+        ) - model.keys()
+
+        # Symbols of decided constraints may take either value
+        total = 2 ** len(unassigned - constrained)
+        for component in components(residual, model):
+            key = (
+                frozenset(component),
+                frozenset(
+                    (name, model[name])
+                    for constraint in component
+                    for name in constraint.symbols() if name in model
+                )
+            )
+            if key not in cache:
+                p = order_symbols(*component)
+                p = next(name for name in p if name not in model)
+                cache[key] = 0
+                for value in (True, False):
+                    model[p] = value
+                    cache[key] += count(component, model)
+                del model[p]
+            total *= cache[key]
+            if not total:
+                return 0
+        return total
+
+    def components(constraints, model):
+        """Groups constraints connected through unassigned symbols."""
+        parent = dict()
+
+        def find(name):
+            while parent[name] != name:
+                parent[name] = parent[parent[name]]
+                name = parent[name]
+            return name
+
+        for constraint in constraints:
+            names = [name for name in constraint.symbols()
+                     if name not in model]
+            for name in names:
+                parent.setdefault(name, name)
+            for name in names[1:]:
+                parent[find(name)] = find(names[0])
+
+        groups = dict()
+        for constraint in constraints:
+            name = next(name for name in constraint.symbols()
+                        if name not in model)
+            groups.setdefault(find(name), []).append(constraint)
+        return list(groups.values())
+
+    extra = set(symbols or ()) - knowledge.symbols()
+    return count(conjuncts_of(knowledge), dict()) * 2 ** len(extra)
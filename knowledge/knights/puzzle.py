@@ -72,8 +72,9 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
+            verdicts = model_check_all(knowledge, symbols)
             for symbol in symbols:
-                if model_check(knowledge, symbol):
+                if verdicts[symbol] == ENTAILED:
                     print(f"    {symbol}")
 
 
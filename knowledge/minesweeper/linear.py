@@ -0,0 +1,158 @@
+import math
+
+
+class ConstraintSystem():
+    """
+    Minesweeper constraints as a sparse integer linear system.
+
+    Each row says that the sum of coefficient * cell over its cells equals
+    its total, where every cell is 0 (safe) or 1 (mine). Rows are kept in
+    reduced row echelon form by fraction-free Gaussian elimination: each
+    row has a pivot cell that appears in no other row. Rows and known
+    cells are added one at a time, so the system is never rebuilt.
+    """
+
+    def __init__(self):
+
+        # Row id -> {cell: coefficient}, and row id -> total
+        self.rows = dict()
+        self.totals = dict()
+
+        # Pivot cell of each row, and the row of each pivot cell
+        self.pivot = dict()
+        self.pivot_row = dict()
+
+        # Cell -> ids of the rows containing it
+        self.columns = dict()
+
+        # Rows changed since the last deduction
+        self.dirty = set()
+        self.next_id = 0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def set_coefficient(self, row_id, cell, coefficient):
+        """Updates one entry of a row, keeping the column index current."""
+        row = self.rows[row_id]
+        if coefficient:
+            row[cell] = coefficient
+            self.columns.setdefault(cell, set()).add(row_id)
+        elif cell in row:
+            del row[cell]
+            self.columns[cell].discard(row_id)
+            if not self.columns[cell]:
+                del self.columns[cell]
+
+    def normalize(self, row_id):
+        """Divides a row by the gcd of its coefficients and total."""
+        row = self.rows[row_id]
+        divisor = math.gcd(self.totals[row_id], *row.values())
+        if divisor > 1:
+            for cell in row:
+                row[cell] //= divisor
+            self.totals[row_id] //= divisor
+
+    def eliminate(self, row_id, pivot_id, cell):
+        """Removes `cell` from a row using the row that has it as pivot."""
+        row = self.rows[row_id]
+        pivot = self.rows[pivot_id]
+        a, b = pivot[cell], row[cell]
+        for other in set(row) | set(pivot):
+            self.set_coefficient(
+                row_id, other,
+                a * row.get(other, 0) - b * pivot.get(other, 0)
+            )
+        self.totals[row_id] = (
+            a * self.totals[row_id] - b * self.totals[pivot_id]
+        )
+        self.normalize(row_id)
+        self.dirty.add(row_id)
+
+    def choose_pivot(self, row_id):
+        """
+        Makes one of a row's cells its pivot, eliminating it from every
+        other row. The cell in the fewest other rows is chosen, to limit
+        fill-in. A row left with no cells is dropped.
+        """
+        row = self.rows[row_id]
+        if not row:
+            self.drop(row_id)
+            return
+        cell = min(row, key=lambda cell: (len(self.columns[cell]), cell))
+        self.pivot[row_id] = cell
+        self.pivot_row[cell] = row_id
+        for other in list(self.columns[cell]):
+            if other != row_id:
+                self.eliminate(other, row_id, cell)
+
+    def drop(self, row_id):
+        """Removes a row from the system."""
+        for cell in list(self.rows[row_id]):
+            self.set_coefficient(row_id, cell, 0)
+        cell = self.pivot.pop(row_id, None)
+        if cell is not None:
+            del self.pivot_row[cell]
+        del self.rows[row_id]
+        del self.totals[row_id]
+        self.dirty.discard(row_id)
+
+    def add(self, cells, count):
+        """Adds the constraint that `count` of `cells` are mines."""
+        if not cells:
+            return
+        row_id = self.next_id
+        self.next_id += 1
+        self.rows[row_id] = dict()
+        self.totals[row_id] = count
+        for cell in cells:
+            self.set_coefficient(row_id, cell, 1)
+
+        # Pivot rows share no pivot cells, so one pass clears them all
+        for cell in [cell for cell in cells if cell in self.pivot_row]:
+            self.eliminate(row_id, self.pivot_row[cell], cell)
+        self.dirty.add(row_id)
+        self.choose_pivot(row_id)
+
+    def assign(self, cell, value):
+        """Substitutes a known value (1 for a mine, 0 for safe) for a cell."""
+        if cell not in self.columns:
+            return
+        for row_id in list(self.columns[cell]):
+            self.totals[row_id] -= self.rows[row_id][cell] * value
+            self.set_coefficient(row_id, cell, 0)
+            self.normalize(row_id)
+            self.dirty.add(row_id)
+
+        # A row that lost its pivot needs a new one
+        row_id = self.pivot_row.pop(cell, None)
+        if row_id is not None:
+            del self.pivot[row_id]
+            self.choose_pivot(row_id)
+
+    def deduce(self):
+        """
+        Returns (mines, safes): cells forced by bound reasoning on the rows
+        changed since the last call. For each cell of a row, the other
+        cells can sum to anything between the sum of their negative and
+        the sum of their positive coefficients; a value of the cell that
+        leaves the total out of that range is impossible.
+        """
+        mines = set()
+        safes = set()
+        for row_id in self.dirty:
+            row = self.rows[row_id]
+            total = self.totals[row_id]
+            low = sum(a for a in row.values() if a < 0)
+            high = sum(a for a in row.values() if a > 0)
+            for cell, a in row.items():
+                rest_low = low - min(a, 0)
+                rest_high = high - max(a, 0)
+                can_be_mine = rest_low <= total - a <= rest_high
+                can_be_safe = rest_low <= total <= rest_high
+                if can_be_mine and not can_be_safe:
+                    mines.add(cell)
+                elif can_be_safe and not can_be_mine:
+                    safes.add(cell)
+        self.dirty.clear()
+        return mines, safes
@@ -1,6 +1,11 @@
 import itertools
 import random
 
+import numpy as np
+
+from linear import ConstraintSystem
+from probability import mine_probabilities
+
 
 class Minesweeper():
     """
@@ -12,25 +17,24 @@ class Minesweeper():
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
-
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
-
-        # At first, player has found no mines
+        # Add mines at distinct random cells
+        self.board = np.zeros((height, width), dtype=bool)
+        positions = random.sample(range(height * width), mines)
+        self.board.flat[positions] = True
+        self.mines = set(divmod(position, width) for position in positions)
+
+        # Count every cell's neighboring mines at once, summing the 3x3
+        # window around each cell of the zero-padded board
+        padded = np.pad(self.board, 1).astype(np.uint8)
+        self.counts = sum(
+            padded[di:di + height, dj:dj + width]
+            for di in range(3) for dj in range(3)
+        ) - self.board
+
+        # At first, player has revealed no cells and found no mines
+        self.revealed = np.zeros((height, width), dtype=bool)
+        self.revealed_count = 0
         self.mines_found = set()
 
     def print(self):
@@ -50,7 +54,7 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board[i, j])
 
     def nearby_mines(self, cell):
         """
@@ -58,24 +62,30 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
+        i, j = cell
+        return int(self.counts[i, j])
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
+    def reveal(self, cell):
+        """
+        Marks a safe cell as revealed and returns its number of
+        nearby mines.
+        """
+        i, j = cell
+        if not self.revealed[i, j]:
+            self.revealed[i, j] = True
+            self.revealed_count += 1
+        return int(self.counts[i, j])
 
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
+    def is_revealed(self, cell):
+        i, j = cell
+        return bool(self.revealed[i, j])
 
-        return count
+    def cleared(self):
+        """
+        Checks if every safe cell has been revealed.
+        """
+        safe = self.height * self.width - len(self.mines)
+        return self.revealed_count == safe
 
     def won(self):
         """
@@ -103,6 +113,13 @@ class Sentence():
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
+    def key(self):
+        """
+        Returns a hashable snapshot of the sentence; equal sentences
+        have equal keys.
+        """
+        return (frozenset(self.cells), self.count)
+
     def known_mines(self):
         """
         Returns the set of all cells in self.cells known to be mines.
@@ -145,12 +162,28 @@ class MinesweeperAI():
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=None, time_limit=1.0,
+                 verbose=True, deduction="subset"):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Total number of mines, if known, for probabilistic guessing,
+        # and the time allowed to compute exact probabilities per guess
+        self.total_mines = mines
+        self.time_limit = time_limit
+
+        # Whether to print the AI's knowledge after every move
+        self.verbose = verbose
+
+        # With "linear" deduction, every sentence is also kept as a row of
+        # a linear system, to find what only several sentences together
+        # imply; "subset" uses subset inference alone
+        if deduction not in ("subset", "linear"):
+            raise ValueError(f"unknown deduction mode {deduction!r}")
+        self.system = ConstraintSystem() if deduction == "linear" else None
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -158,8 +191,91 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Stack of safe cells, some possibly chosen since they were added
+        self.safe_moves = []
+
+        # Cells neither chosen nor known to be mines, as a list for
+        # uniform random choice and a position map for O(1) removal
+        self.unexplored = [
+            (i, j) for i in range(height) for j in range(width)
+        ]
+        self.position = {
+            cell: k for k, cell in enumerate(self.unexplored)
+        }
+
+        # Sentences about the game known to be true, by key, so that
+        # duplicates are never stored twice
+        self.keys = dict()
+
+        # Sentences containing each cell, as {id(sentence): sentence}
+        self.index = dict()
+
+        # Sentences changed since they were last examined, by id
+        self.agenda = dict()
+
+        # Inference rounds and knowledge size after each move
+        self.stats = []
+
+    @property
+    def knowledge(self):
+        """List of sentences about the game known to be true."""
+        return list(self.keys.values())
+
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base, indexes it by its cells
+        and queues it for inference. Returns False, adding nothing, if the
+        sentence is empty or already known.
+        """
+        # A sentence inferred earlier in a round may mention cells marked
+        # since; only unknown cells are kept
+        for cell in [
+            cell for cell in sentence.cells
+            if cell in self.mines or cell in self.safes
+        ]:
+            if cell in self.mines:
+                sentence.mark_mine(cell)
+            else:
+                sentence.mark_safe(cell)
+        key = sentence.key()
+        if not sentence.cells or key in self.keys:
+            return False
+        self.keys[key] = sentence
+        for cell in sentence.cells:
+            self.index.setdefault(cell, dict())[id(sentence)] = sentence
+        self.agenda[id(sentence)] = sentence
+        return True
+
+    def update_sentence(self, sentence, change, cell):
+        """
+        Applies `change` (Sentence.mark_mine or Sentence.mark_safe) for
+        `cell` to an indexed sentence, keeping its key current. A sentence
+        left empty, or equal to another known one, is dropped.
+        """
+        del self.keys[sentence.key()]
+        change(sentence, cell)
+        key = sentence.key()
+        if sentence.cells and key not in self.keys:
+            self.keys[key] = sentence
+            self.agenda[id(sentence)] = sentence
+            return
+        for other in sentence.cells:
+            del self.index[other][id(sentence)]
+        self.agenda.pop(id(sentence), None)
+
+    def explored(self, cell):
+        """Removes a cell from the unexplored cells, if it is there."""
+        k = self.position.pop(cell, None)
+        if k is None:
+            return
+        last = self.unexplored.pop()
+        if k < len(self.unexplored):
+            self.unexplored[k] = last
+            self.position[last] = k
+
+    def live(self, sentence):
+        """Checks if a sentence is still part of the knowledge base."""
+        return self.keys.get(sentence.key()) is sentence
 
     def mark_mine(self, cell):
         """
@@ -167,20 +283,24 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            #print("mines", sentence)
-            sentence.mark_mine(cell)
+        self.explored(cell)
+        if self.system is not None:
+            self.system.assign(cell, 1)
+        for sentence in list(self.index.pop(cell, dict()).values()):
+            self.update_sentence(sentence, Sentence.mark_mine, cell)
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
-        #print(self.knowledge)
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            #print("safes", sentence)
-            sentence.mark_safe(cell)
+        if cell not in self.moves_made:
+            self.safe_moves.append(cell)
+        if self.system is not None:
+            self.system.assign(cell, 0)
+        for sentence in list(self.index.pop(cell, dict()).values()):
+            self.update_sentence(sentence, Sentence.mark_safe, cell)
 
     def nearby_cells(self, cell):
         neighbor = set()
@@ -199,26 +319,54 @@ class MinesweeperAI():
 
     def add_(self):
         """
-        mark any additional cells as safe or as mines
-        if it can be concluded based on the AI's knowledge base
+        Runs inference to a fixpoint: marks cells as safe or as mines when
+        a sentence settles them, and adds the difference of every pair of
+        sentences where one's cells are a subset of the other's. Only
+        sentences that changed are examined in each round, and they are
+        compared only with sentences sharing a cell.
+
+        Returns the number of rounds it took.
         """
-        try:
-            for sentence in self.knowledge:
-                if len(sentence.cells)==0:
-                    self.knowledge.remove(sentence)
+        rounds = 0
+        while self.agenda:
+            rounds += 1
+            dirty = list(self.agenda.values())
+            self.agenda.clear()
+            inferred = []
+            for sentence in dirty:
+                if not self.live(sentence):
+                    continue
+
+                # A settled sentence marks its cells and is dropped
                 safes = sentence.known_safes()
-                if safes:
-                    for safe in safes.copy():
-                        #temp = tuple(cell)
+                mines = sentence.known_mines()
+                if safes or mines:
+                    for safe in (safes or set()).copy():
                         self.mark_safe(safe)
-                else:
-                    mines = sentence.known_mines()
-                    if mines:
-                        for mine in mines.copy():
-                            #temp = tuple(cell)
-                            self.mark_mine(mine)
-        except Exception as e:
-            print(e)
+                    for mine in (mines or set()).copy():
+                        self.mark_mine(mine)
+                    continue
+
+                # Any subset or superset of the sentence shares a cell
+                related = dict()
+                for cell in sentence.cells:
+                    related.update(self.index[cell])
+                related.pop(id(sentence))
+                for other in related.values():
+                    if other.cells < sentence.cells:
+                        inferred.append(Sentence(
+                            sentence.cells - other.cells,
+                            sentence.count - other.count
+                        ))
+                    elif sentence.cells < other.cells:
+                        inferred.append(Sentence(
+                            other.cells - sentence.cells,
+                            other.count - sentence.count
+                        ))
+            for sentence in inferred:
+                self.add_sentence(sentence)
+
+        return rounds
 
     def add_knowledge(self, cell, count):
         """
@@ -238,6 +386,7 @@ class MinesweeperAI():
         #sentence = Sentence(cell, count)
         #print((cell, count))
         self.moves_made.add(cell)
+        self.explored(cell)
         if cell not in self.safes:
             self.mark_safe(cell)
         #i,j = cell
@@ -266,28 +415,36 @@ class MinesweeperAI():
         #elif i in range(1,7) and j==7:
         #    # no rights
         #    neighbor = [(i-1,j),(i+1,j),(i,j-1),(i-1,j-1),(i+1,j-1)]
-        neighbor = self.nearby_cells(cell)
-        neighbor -= self.safes|self.moves_made
-        new_sentence = Sentence(neighbor, count)
-        self.knowledge.append(new_sentence)
-        self.add_()
-
-        new_inferences = []
-        prev_sentence = new_sentence
-        
-        for sentence in self.knowledge:
-            if len(sentence.cells)==0:
-                self.knowledge.remove(sentence)
-            elif prev_sentence == sentence:
+        neighbor = set(
+            nearby for nearby in self.nearby_cells(cell)
+            if nearby not in self.safes and nearby not in self.moves_made
+        )
+        known_mines = neighbor & self.mines
+        new_sentence = Sentence(neighbor - known_mines,
+                                count - len(known_mines))
+        if self.system is not None:
+            self.system.add(new_sentence.cells, new_sentence.count)
+        self.add_sentence(new_sentence)
+        rounds = self.add_()
+
+        # Alternate linear deduction with subset inference until neither
+        # finds anything new
+        while self.system is not None:
+            mines, safes = self.system.deduce()
+            mines -= self.mines
+            safes -= self.safes
+            if not mines and not safes:
                 break
-            elif prev_sentence.cells < sentence.cells:
-                    new_cells,n_count = (prev_sentence.cells-sentence.cells,
-                            prev_sentence.count-sentence.count)
-                    new_inferences.append(Sentence(new_cells,n_count))
-            prev_sentence = sentence
-        self.knowledge += new_inferences
-        print("safes", self.safes)
-        print("mines", self.mines)
+            for mine in mines:
+                self.mark_mine(mine)
+            for safe in safes:
+                self.mark_safe(safe)
+            rounds += self.add_()
+        self.stats.append({"rounds": rounds, "knowledge": len(self.keys)})
+        if self.verbose:
+            print("rounds", rounds, "knowledge", len(self.keys))
+            print("safes", self.safes)
+            print("mines", self.mines)
 
     def make_safe_move(self):
         """
@@ -298,13 +455,10 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        #print(self.safes)
-        space = self.safes-self.moves_made
-        #print(space)
-        if space:
-            return space.pop()
-        else:
-            return None
+        # Moves made since a cell was stacked are skipped lazily
+        while self.safe_moves and self.safe_moves[-1] in self.moves_made:
+            self.safe_moves.pop()
+        return self.safe_moves[-1] if self.safe_moves else None
 
     def make_random_move(self):
         """
@@ -312,22 +466,25 @@ class MinesweeperAI():
         Should choose randomly among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+        If the total number of mines is known, the cell with the lowest
+        probability of being a mine is chosen instead.
         """
-        def get_move():
-            return (
-                    random.randrange(self.height),
-                    random.randrange(self.width)
-                )
-        # Total numer of safe moves = 56
-        if len(self.moves_made)==56:
+        if not self.unexplored:
             return None
-        random_move = get_move()
-        space = self.moves_made.union(self.mines)
-        #space-=self.moves_made
-        #print("mines", self.mines)
-        #print("moves", self.moves_made)
-        #print(space)
-        while random_move in space:
-            random_move = get_move()
-        return random_move
+
+        # With the mine count known, take the cell least likely to be a mine
+        if self.total_mines is not None:
+            unknown = set(self.unexplored) - self.safes
+            if unknown:
+                probabilities = mine_probabilities(
+                    self.knowledge, unknown,
+                    self.total_mines - len(self.mines), self.time_limit
+                )
+                lowest = min(probabilities.values())
+                return random.choice(sorted(
+                    cell for cell, probability in probabilities.items()
+                    if probability <= lowest + 1e-12
+                ))
+
+        return random.choice(self.unexplored)
 
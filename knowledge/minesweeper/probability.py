@@ -0,0 +1,316 @@
+import math
+import random
+import time
+
+
+class TimeUp(Exception):
+    """Raised when exact enumeration runs past its deadline."""
+
+
+def components(sentences):
+    """
+    Splits sentences into groups that share no cells.
+    Returns a list of (cells, sentences) pairs; cells are listed in the
+    order the sentences reach them, so that constraints close early.
+    """
+    by_cell = dict()
+    for sentence in sentences:
+        for cell in sentence.cells:
+            by_cell.setdefault(cell, []).append(sentence)
+
+    groups = []
+    seen_cells = set()
+    seen_sentences = set()
+    for start in by_cell:
+        if start in seen_cells:
+            continue
+        cells = [start]
+        group = []
+        seen_cells.add(start)
+        for cell in cells:
+            for sentence in by_cell[cell]:
+                if id(sentence) in seen_sentences:
+                    continue
+                seen_sentences.add(id(sentence))
+                group.append(sentence)
+                for other in sorted(sentence.cells):
+                    if other not in seen_cells:
+                        seen_cells.add(other)
+                        cells.append(other)
+        groups.append((cells, group))
+    return groups
+
+
+def enumerate_component(cells, sentences, deadline):
+    """
+    Counts the mine assignments to `cells` consistent with `sentences`.
+
+    Returns a dict mapping a number of mines m to (ways, counts), where
+    `ways` is the number of consistent assignments with m mines, and
+    counts[k] is how many of those put a mine on cells[k]. Cells are
+    assigned in order; partial results are memoized on the position and
+    the mines still owed by the constraints that are open there.
+    """
+    position = {cell: k for k, cell in enumerate(cells)}
+    n = len(cells)
+    constraints = [
+        sorted(position[cell] for cell in sentence.cells)
+        for sentence in sentences
+    ]
+    residual = [sentence.count for sentence in sentences]
+
+    # Constraints touching each position, and those open before it
+    touching = [[] for _ in range(n)]
+    active = [[] for _ in range(n + 1)]
+    for index, members in enumerate(constraints):
+        for k in members:
+            touching[k].append(index)
+        for k in range(members[0] + 1, members[-1] + 1):
+            active[k].append(index)
+
+    # Cells of each constraint still unassigned after each of its members
+    left_after = [
+        {k: len(members) - i - 1 for i, k in enumerate(members)}
+        for members in constraints
+    ]
+
+    memo = dict()
+
+    def solve(k):
+        if k == n:
+            return {0: (1, [])}
+        key = (k, tuple(residual[index] for index in active[k]))
+        if key in memo:
+            return memo[key]
+        if time.monotonic() > deadline:
+            raise TimeUp
+
+        result = dict()
+        for value in (0, 1):
+            feasible = True
+            for index in touching[k]:
+                owed = residual[index] - value
+                if owed < 0 or owed > left_after[index][k]:
+                    feasible = False
+                    break
+            if not feasible:
+                continue
+            for index in touching[k]:
+                residual[index] -= value
+            for mines, (ways, counts) in solve(k + 1).items():
+                total = mines + value
+                ways_so_far, counts_so_far = result.get(
+                    total, (0, [0] * (n - k))
+                )
+                counts_so_far[0] += ways * value
+                for offset, count in enumerate(counts, start=1):
+                    counts_so_far[offset] += count
+                result[total] = (ways_so_far + ways, counts_so_far)
+            for index in touching[k]:
+                residual[index] += value
+
+        memo[key] = result
+        return result
+
+    return solve(0)
+
+
+def convolve(a, b):
+    """Combines two {mines: ways} distributions of independent parts."""
+    result = dict()
+    for m, x in a.items():
+        for n, y in b.items():
+            result[m + n] = result.get(m + n, 0) + x * y
+    return result
+
+
+def exact_probabilities(groups, interior, mines_left, deadline):
+    """
+    Returns exact mine probabilities for the cells of `groups` and for
+    any one of the `interior` unknown cells that no sentence mentions,
+    weighting each combination of component solutions by the number of
+    ways to place the remaining mines in the interior. Returns None if no
+    combination is consistent with `mines_left`.
+    """
+    solved = [
+        enumerate_component(cells, sentences, deadline)
+        for cells, sentences in groups
+    ]
+    ways = [
+        {m: result[m][0] for m in result} for result in solved
+    ]
+
+    def interior_ways(mines):
+        if mines < 0 or mines > interior:
+            return 0
+        return math.comb(interior, mines)
+
+    # Distribution of mines over the frontier as a whole
+    total = {0: 1}
+    for distribution in ways:
+        total = convolve(total, distribution)
+    weight = sum(
+        count * interior_ways(mines_left - m) for m, count in total.items()
+    )
+    if weight == 0:
+        return None
+
+    probabilities = dict()
+    for i, ((cells, _), result) in enumerate(zip(groups, solved)):
+        others = {0: 1}
+        for j, distribution in enumerate(ways):
+            if j != i:
+                others = convolve(others, distribution)
+        for m, (_, counts) in result.items():
+            scale = sum(
+                count * interior_ways(mines_left - m - t)
+                for t, count in others.items()
+            )
+            for cell, count in zip(cells, counts):
+                probabilities[cell] = (
+                    probabilities.get(cell, 0) + count * scale
+                )
+    for cell in probabilities:
+        probabilities[cell] /= weight
+
+    interior_probability = None
+    if interior:
+        expected = sum(
+            count * interior_ways(mines_left - m) * (mines_left - m)
+            for m, count in total.items()
+        )
+        interior_probability = expected / weight / interior
+    return probabilities, interior_probability
+
+
+def sampled_probabilities(groups, interior, mines_left, deadline):
+    """
+    Estimates mine probabilities by drawing random consistent assignments
+    of each component until the deadline, for when exact enumeration takes
+    too long. Each component gets an equal share of the time. Samples are
+    not weighted by the global mine count.
+    """
+    probabilities = dict()
+    frontier_mines = 0
+    for number, (cells, sentences) in enumerate(groups):
+        share = (deadline - time.monotonic()) / (len(groups) - number)
+        group_deadline = time.monotonic() + share
+        members = [list(sentence.cells) for sentence in sentences]
+        containing = {cell: [] for cell in cells}
+        for index, sentence in enumerate(sentences):
+            for cell in sentence.cells:
+                containing[cell].append(index)
+
+        hits = {cell: 0 for cell in cells}
+        samples = 0
+        while True:
+            try:
+                assignment = sample(cells, sentences, members, containing)
+            except RecursionError:
+                assignment = None
+            if assignment is not None:
+                samples += 1
+                for cell in assignment:
+                    hits[cell] += 1
+            if time.monotonic() > group_deadline and (
+                samples or assignment is None
+            ):
+                break
+
+        for cell in cells:
+            if samples:
+                probabilities[cell] = hits[cell] / samples
+            else:
+                # Fall back to the densest sentence containing the cell
+                probabilities[cell] = max(
+                    sentences[index].count / len(members[index])
+                    for index in containing[cell]
+                )
+        frontier_mines += sum(probabilities[cell] for cell in cells)
+
+    interior_probability = None
+    if interior:
+        interior_probability = min(
+            1, max(0, (mines_left - frontier_mines) / interior)
+        )
+    return probabilities, interior_probability
+
+
+def sample(cells, sentences, members, containing, budget=1000):
+    """
+    Returns the set of mine cells of one random assignment consistent with
+    `sentences`, found by randomized backtracking, or None if `budget`
+    steps pass without finding one.
+    """
+    order = cells[:]
+    random.shuffle(order)
+    residual = [sentence.count for sentence in sentences]
+    unassigned = [len(cells_) for cells_ in members]
+    mines = set()
+    steps = [0]
+
+    def assign(k):
+        if k == len(order):
+            return True
+        steps[0] += 1
+        if steps[0] > budget:
+            return False
+        cell = order[k]
+        values = [0, 1]
+        random.shuffle(values)
+        for value in values:
+            if all(
+                0 <= residual[index] - value <= unassigned[index] - 1
+                for index in containing[cell]
+            ):
+                for index in containing[cell]:
+                    residual[index] -= value
+                    unassigned[index] -= 1
+                if value:
+                    mines.add(cell)
+                if assign(k + 1):
+                    return True
+                mines.discard(cell)
+                for index in containing[cell]:
+                    residual[index] += value
+                    unassigned[index] += 1
+        return False
+
+    return mines if assign(0) else None
+
+
+def mine_probabilities(sentences, unknown, mines_left, time_limit=1.0):
+    """
+    Returns a dict mapping each cell in `unknown` to the probability that
+    it is a mine, given `sentences` (about unknown cells only) and the
+    number of mines not yet found.
+
+    The frontier is split into independent components whose consistent
+    assignments are enumerated exactly and combined by counting the ways
+    to place the remaining mines in the other unknown cells. If that runs
+    past `time_limit` seconds, probabilities are estimated by sampling for
+    up to another `time_limit` seconds instead.
+    """
+    groups = components(sentences)
+    frontier = set(cell for cells, _ in groups for cell in cells)
+    interior = len(unknown) - len(frontier)
+
+    estimate = None
+    try:
+        estimate = exact_probabilities(
+            groups, interior, mines_left,
+            time.monotonic() + time_limit
+        )
+    except (TimeUp, RecursionError):
+        pass
+    if estimate is None:
+        estimate = sampled_probabilities(
+            groups, interior, mines_left,
+            time.monotonic() + time_limit
+        )
+
+    probabilities, interior_probability = estimate
+    return {
+        cell: probabilities.get(cell, interior_probability)
+        for cell in unknown
+    }
@@ -1,6 +1,5 @@
 import pygame
 import sys
-import time
 
 from minesweeper import Minesweeper, MinesweeperAI
 
@@ -10,6 +9,9 @@ HEIGHT = 8
 WIDTH = 8
 MINES = 8
 
+# Frame rate cap
+FPS = 60
+
 # Colors
 BLACK = (0, 0, 0)
 GRAY = (180, 180, 180)
@@ -39,186 +41,270 @@ flag = pygame.transform.scale(flag, (cell_size, cell_size))
 mine = pygame.image.load(path+"\\assets\\images\\mine.png")
 mine = pygame.transform.scale(mine, (cell_size, cell_size))
 
+
+def make_tile(image=None):
+    """Renders a cell once: a bordered square with an image centered on it."""
+    tile = pygame.Surface((cell_size, cell_size))
+    rect = tile.get_rect()
+    pygame.draw.rect(tile, GRAY, rect)
+    pygame.draw.rect(tile, WHITE, rect, 3)
+    if image is not None:
+        imageRect = image.get_rect()
+        imageRect.center = rect.center
+        tile.blit(image, imageRect)
+    return tile.convert()
+
+
+# Pre-rendered cells, by state: hidden, flagged, mine, or a revealed count
+tiles = {"hidden": make_tile(), "flag": make_tile(flag), "mine": make_tile(mine)}
+for n in range(9):
+    tiles[n] = make_tile(smallFont.render(str(n), True, BLACK))
+
+# Persistent board surface; only cells whose state changed are redrawn
+board = pygame.Surface((WIDTH * cell_size, HEIGHT * cell_size)).convert()
+boardRect = board.get_rect(topleft=board_origin)
+shown = dict()
+
+# Side panel layout
+aiButton = pygame.Rect(
+    (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50,
+    (width / 3) - BOARD_PADDING * 2, 50
+)
+resetButton = pygame.Rect(
+    (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 20,
+    (width / 3) - BOARD_PADDING * 2, 50
+)
+statusRect = pygame.Rect(
+    (2 / 3) * width, (2 / 3) * height - 25, width / 3, 50
+)
+fpsRect = pygame.Rect(
+    (2 / 3) * width + BOARD_PADDING, height - BOARD_PADDING - 20,
+    (width / 3) - BOARD_PADDING * 2, 20
+)
+fpsFont = pygame.font.Font(OPEN_SANS, 12)
+
+
+def cell_state(cell):
+    """Returns the key of the tile a cell should show."""
+    if lost and game.is_mine(cell):
+        return "mine"
+    if cell in flags:
+        return "flag"
+    if game.is_revealed(cell):
+        return game.nearby_mines(cell)
+    return "hidden"
+
+
+def draw_cells(cells):
+    """
+    Redraws the given cells where their state has changed, on the board
+    surface and on the screen. Returns the screen rectangles drawn.
+    """
+    rects = []
+    for cell in cells:
+        state = cell_state(cell)
+        if shown.get(cell) == state:
+            continue
+        shown[cell] = state
+        area = pygame.Rect(
+            cell[1] * cell_size, cell[0] * cell_size, cell_size, cell_size
+        )
+        board.blit(tiles[state], area)
+        rects.append(screen.blit(board, area.move(board_origin), area))
+    return rects
+
+
+def draw_panel():
+    """Draws the side panel buttons, which never change during a game."""
+    for button, label in ((aiButton, "AI Move"), (resetButton, "Reset")):
+        buttonText = mediumFont.render(label, True, BLACK)
+        buttonRect = buttonText.get_rect()
+        buttonRect.center = button.center
+        pygame.draw.rect(screen, WHITE, button)
+        screen.blit(buttonText, buttonRect)
+
+
+def draw_status(text):
+    """Draws the won or lost message in its own area of the screen."""
+    screen.fill(BLACK, statusRect)
+    text = mediumFont.render(text, True, WHITE)
+    textRect = text.get_rect()
+    textRect.center = statusRect.center
+    screen.blit(text, textRect)
+
+
+def draw_fps():
+    """Draws the frame rate and the last frame's time."""
+    screen.fill(BLACK, fpsRect)
+    text = fpsFont.render(
+        f"{clock.get_fps():.0f} FPS  {clock.get_rawtime()} ms/frame",
+        True, GRAY
+    )
+    screen.blit(text, fpsRect)
+
+
+def cell_at(position):
+    """Returns the board cell under a screen position, or None."""
+    if not boardRect.collidepoint(position):
+        return None
+    return (
+        (position[1] - board_origin[1]) // cell_size,
+        (position[0] - board_origin[0]) // cell_size
+    )
+
+
+ALL_CELLS = [(i, j) for i in range(HEIGHT) for j in range(WIDTH)]
+
 # Create game and AI agent
 game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES)
 
-# Keep track of revealed cells, flagged cells, and if a mine was hit
-revealed = set()
+# Keep track of flagged cells and if a mine was hit
 flags = set()
 lost = False
 
 # Show instructions initially
 instructions = True
 
+clock = pygame.time.Clock()
+
+# Whether the whole screen must be drawn again, and the last status shown
+redraw = True
+status = None
+
 while True:
+    clock.tick(FPS)
 
-    # Check if game quit
+    # Handle quitting and clicks; a click is a button press, so holding
+    # the mouse down acts once
+    left = right = None
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             sys.exit()
-
-    screen.fill(BLACK)
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            if event.button == 1:
+                left = event.pos
+            elif event.button == 3:
+                right = event.pos
 
     # Show game instructions
     if instructions:
-
-        # Title
-        title = largeFont.render("Play Minesweeper", True, WHITE)
-        titleRect = title.get_rect()
-        titleRect.center = ((width / 2), 50)
-        screen.blit(title, titleRect)
-
-        # Rules
-        rules = [
-            "Click a cell to reveal it.",
-            "Right-click a cell to mark it as a mine.",
-            "Mark all mines successfully to win!"
-        ]
-        for i, rule in enumerate(rules):
-            line = smallFont.render(rule, True, WHITE)
-            lineRect = line.get_rect()
-            lineRect.center = ((width / 2), 150 + 30 * i)
-            screen.blit(line, lineRect)
-
-        # Play game button
-        buttonRect = pygame.Rect((width / 4), (3 / 4) * height, width / 2, 50)
-        buttonText = mediumFont.render("Play Game", True, BLACK)
-        buttonTextRect = buttonText.get_rect()
-        buttonTextRect.center = buttonRect.center
-        pygame.draw.rect(screen, WHITE, buttonRect)
-        screen.blit(buttonText, buttonTextRect)
+        if redraw:
+            screen.fill(BLACK)
+
+            # Title
+            title = largeFont.render("Play Minesweeper", True, WHITE)
+            titleRect = title.get_rect()
+            titleRect.center = ((width / 2), 50)
+            screen.blit(title, titleRect)
+
+            # Rules
+            rules = [
+                "Click a cell to reveal it.",
+                "Right-click a cell to mark it as a mine.",
+                "Mark all mines successfully to win!"
+            ]
+            for i, rule in enumerate(rules):
+                line = smallFont.render(rule, True, WHITE)
+                lineRect = line.get_rect()
+                lineRect.center = ((width / 2), 150 + 30 * i)
+                screen.blit(line, lineRect)
+
+            # Play game button
+            buttonRect = pygame.Rect(
+                (width / 4), (3 / 4) * height, width / 2, 50
+            )
+            buttonText = mediumFont.render("Play Game", True, BLACK)
+            buttonTextRect = buttonText.get_rect()
+            buttonTextRect.center = buttonRect.center
+            pygame.draw.rect(screen, WHITE, buttonRect)
+            screen.blit(buttonText, buttonTextRect)
+            pygame.display.flip()
+            redraw = False
 
         # Check if play button clicked
-        click, _, _ = pygame.mouse.get_pressed()
-        if click == 1:
-            mouse = pygame.mouse.get_pos()
-            if buttonRect.collidepoint(mouse):
-                instructions = False
-                time.sleep(0.3)
-
-        pygame.display.flip()
+        if left is not None and buttonRect.collidepoint(left):
+            instructions = False
+            redraw = True
         continue
 
-    # Draw board
-    cells = []
-    for i in range(HEIGHT):
-        row = []
-        for j in range(WIDTH):
-
-            # Draw rectangle for cell
-            rect = pygame.Rect(
-                board_origin[0] + j * cell_size,
-                board_origin[1] + i * cell_size,
-                cell_size, cell_size
-            )
-            pygame.draw.rect(screen, GRAY, rect)
-            pygame.draw.rect(screen, WHITE, rect, 3)
-
-            # Add a mine, flag, or number if needed
-            if game.is_mine((i, j)) and lost:
-                screen.blit(mine, rect)
-            elif (i, j) in flags:
-                screen.blit(flag, rect)
-            elif (i, j) in revealed:
-                neighbors = smallFont.render(
-                    str(game.nearby_mines((i, j))),
-                    True, BLACK
-                )
-                neighborsTextRect = neighbors.get_rect()
-                neighborsTextRect.center = rect.center
-                screen.blit(neighbors, neighborsTextRect)
-
-            row.append(rect)
-        cells.append(row)
-
-    # AI Move button
-    aiButton = pygame.Rect(
-        (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50,
-        (width / 3) - BOARD_PADDING * 2, 50
-    )
-    buttonText = mediumFont.render("AI Move", True, BLACK)
-    buttonRect = buttonText.get_rect()
-    buttonRect.center = aiButton.center
-    pygame.draw.rect(screen, WHITE, aiButton)
-    screen.blit(buttonText, buttonRect)
-
-    # Reset button
-    resetButton = pygame.Rect(
-        (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 20,
-        (width / 3) - BOARD_PADDING * 2, 50
-    )
-    buttonText = mediumFont.render("Reset", True, BLACK)
-    buttonRect = buttonText.get_rect()
-    buttonRect.center = resetButton.center
-    pygame.draw.rect(screen, WHITE, resetButton)
-    screen.blit(buttonText, buttonRect)
-
-    # Display text
-    text = "Lost" if lost else "Won" if game.mines == flags else ""
-    text = mediumFont.render(text, True, WHITE)
-    textRect = text.get_rect()
-    textRect.center = ((5 / 6) * width, (2 / 3) * height)
-    screen.blit(text, textRect)
-
     move = None
 
-    left, _, right = pygame.mouse.get_pressed()
+    # Cells whose state may have changed this frame
+    changed = []
 
     # Check for a right-click to toggle flagging
-    if right == 1 and not lost:
-        mouse = pygame.mouse.get_pos()
-        for i in range(HEIGHT):
-            for j in range(WIDTH):
-                if cells[i][j].collidepoint(mouse) and (i, j) not in revealed:
-                    if (i, j) in flags:
-                        flags.remove((i, j))
-                    else:
-                        flags.add((i, j))
-                    time.sleep(0.2)
-
-    elif left == 1:
-        mouse = pygame.mouse.get_pos()
+    if right is not None and not lost:
+        cell = cell_at(right)
+        if cell is not None and not game.is_revealed(cell):
+            if cell in flags:
+                flags.remove(cell)
+            else:
+                flags.add(cell)
+            changed.append(cell)
+
+    elif left is not None:
 
         # If AI button clicked, make an AI move
-        if aiButton.collidepoint(mouse) and not lost:
+        if aiButton.collidepoint(left) and not lost:
             move = ai.make_safe_move()
             if move is None:
                 move = ai.make_random_move()
                 if move is None:
+                    changed.extend(flags ^ ai.mines)
                     flags = ai.mines.copy()
                     print("No moves left to make.")
                 else:
                     print("No known safe moves, AI making random move.")
             else:
                 print("AI making safe move.")
-            time.sleep(0.2)
 
         # Reset game state
-        elif resetButton.collidepoint(mouse):
+        elif resetButton.collidepoint(left):
             game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-            ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
-            revealed = set()
+            ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES)
             flags = set()
             lost = False
-            continue
+            shown.clear()
+            redraw = True
 
         # User-made move
         elif not lost:
-            for i in range(HEIGHT):
-                for j in range(WIDTH):
-                    if (cells[i][j].collidepoint(mouse)
-                            and (i, j) not in flags
-                            and (i, j) not in revealed):
-                        move = (i, j)
+            cell = cell_at(left)
+            if (cell is not None
+                    and cell not in flags
+                    and not game.is_revealed(cell)):
+                move = cell
 
     # Make move and update AI knowledge
     if move:
         if game.is_mine(move):
             lost = True
+            changed.extend(game.mines)
         else:
-            nearby = game.nearby_mines(move)
-            revealed.add(move)
+            nearby = game.reveal(move)
+            changed.append(move)
             ai.add_knowledge(move, nearby)
 
-    pygame.display.flip()
+    # Update only the parts of the screen that changed
+    dirty = []
+    if redraw:
+        screen.fill(BLACK)
+        draw_cells(ALL_CELLS)
+        draw_panel()
+        status = None
+        dirty.append(screen.get_rect())
+        redraw = False
+    else:
+        dirty.extend(draw_cells(changed))
+
+    won = game.mines == flags or game.cleared()
+    text = "Lost" if lost else "Won" if won else ""
+    if text != status:
+        draw_status(text)
+        status = text
+        dirty.append(statusRect)
+
+    draw_fps()
+    dirty.append(fpsRect)
+    pygame.display.update(dirty)
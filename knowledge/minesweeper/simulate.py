@@ -0,0 +1,138 @@
+import argparse
+import json
+import multiprocessing
+import random
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+
+def play(settings):
+    """
+    Plays one seeded game with the AI and returns its result: whether it
+    was won, the number of moves, and the time each move spent choosing a
+    cell and updating the AI's knowledge.
+    """
+    seed, height, width, mines, guided, verbose, deduction = settings
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(
+        height=height, width=width,
+        mines=mines if guided else None, verbose=verbose,
+        deduction=deduction
+    )
+
+    decisions = []
+    inferences = []
+    won = False
+    while True:
+        start = time.perf_counter()
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+        decisions.append(time.perf_counter() - start)
+        if move is None or game.is_mine(move):
+            break
+
+        start = time.perf_counter()
+        ai.add_knowledge(move, game.reveal(move))
+        inferences.append(time.perf_counter() - start)
+
+        if game.cleared():
+            won = True
+            break
+
+    return {
+        "seed": seed,
+        "won": won,
+        "moves": len(decisions),
+        "decision_seconds": decisions,
+        "inference_seconds": inferences,
+    }
+
+
+def percentile(values, q):
+    """Returns the q-th percentile of values, by nearest rank."""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(0, min(len(values) - 1, round(q / 100 * len(values)) - 1))
+    return values[rank]
+
+
+def simulate(games, height, width, mines, seed=0, processes=None,
+             guided=True, verbose=False, deduction="subset"):
+    """
+    Plays `games` games across a pool of processes, seeded seed,
+    seed + 1, ..., and returns the list of game results.
+    """
+    settings = [
+        (seed + n, height, width, mines, guided, verbose, deduction)
+        for n in range(games)
+    ]
+    with multiprocessing.Pool(processes) as pool:
+        return list(pool.imap_unordered(play, settings, chunksize=4))
+
+
+def summarize(results):
+    """Returns win rate, moves per game and latency percentiles."""
+    moves = [result["moves"] for result in results]
+    summary = {
+        "games": len(results),
+        "win_rate": sum(result["won"] for result in results) / len(results),
+        "moves_per_game": sum(moves) / len(moves),
+    }
+    for kind in ("inference", "decision"):
+        latencies = [
+            seconds for result in results
+            for seconds in result[f"{kind}_seconds"]
+        ]
+        for q in (50, 90, 99):
+            summary[f"{kind}_p{q}_ms"] = (
+                None if not latencies else percentile(latencies, q) * 1000
+            )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play Minesweeper games with the AI, without a display."
+    )
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--mines", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--random-guesses", action="store_true",
+                        help="guess uniformly instead of by mine probability")
+    parser.add_argument("--deduction", choices=["subset", "linear"],
+                        default="subset")
+    parser.add_argument("--verbose", action="store_true",
+                        help="print the AI's knowledge after every move")
+    parser.add_argument("--json", help="file to write every game result to")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = simulate(
+        args.games, args.height, args.width, args.mines,
+        seed=args.seed, processes=args.processes,
+        guided=not args.random_guesses, verbose=args.verbose,
+        deduction=args.deduction
+    )
+    elapsed = time.perf_counter() - start
+
+    for name, value in summarize(results).items():
+        if isinstance(value, float):
+            value = f"{value:.3f}"
+        print(f"{name}: {value}")
+    print(f"elapsed_seconds: {elapsed:.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(sorted(results, key=lambda r: r["seed"]), f)
+
+
+if __name__ == "__main__":
+    main()